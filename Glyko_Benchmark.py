@@ -0,0 +1,272 @@
+# Benchmark und Regressionsprüfung für den Simulationskern
+#
+# Aufruf:
+#   python Glyko_Benchmark.py --json ergebnis.json                 # Messung, Ergebnis als JSON
+#   python Glyko_Benchmark.py --compare alt.json --json neu.json   # zusätzlich Vergleich mit einer früheren Messung
+#   python Glyko_Benchmark.py --update-golden                      # Referenzverläufe neu schreiben (nur nach gewollter Modelländerung)
+#
+# Gemessen werden Durchsatz (Schritte/s), Spitzenspeicher (tracemalloc) und Konstruktionskosten von GlycolysisPathway
+# für alle Engines/Backends, Schrittzahlen und Batch-Größen sowie die Genauigkeit gegenüber gespeicherten Referenzverläufen.
+# Zusätzlich wird die Importzeit von Glykolyse_1 in einem frischen Prozess gegen ein Budget geprüft (keine schweren Abhängigkeiten beim Start).
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Glykolyse_1 import GlycolysisPathway
+
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Glyko_Benchmark_golden.json")
+GOLDEN_STEPS = 1000
+GOLDEN_ROWS = [0, 1, 10, 100, 1000]                                  # gespeicherte Zeilen der Referenzverläufe
+GOLDEN_RTOL = 1e-12
+
+
+# Szenarien: Literaturwerte und steife Belastungsfälle
+
+
+def _stiff_tpi(model):                                               # Triosephosphatisomerase 100× schneller → stark steifes System (vmax folgt kcat automatisch)
+    model.triosephosphat_isomerase.kcat *= 100                       # vmax/Km ≈ 1400/s → bei dt=5e-4 ist vmax·dt/Km ≈ 0.7 < 1: min(delta, conc) greift nicht, Euler bleibt stabil
+
+
+def _small_km(model):                                                # sehr kleine Km-Werte → Geschwindigkeiten springen nahe 0
+    for enzyme in model.enzymes:
+        enzyme.km = 1e-3
+
+
+SCENARIOS = {
+    "literatur": {"glucose": 10.0, "dt": 0.1, "setup": None},
+    "steif_tpi": {"glucose": 10.0, "dt": 5e-4, "setup": _stiff_tpi},   # bei dt=0.1 setzt die Begrenzung schon mit Literaturwerten den ganzen DHAP-Vorrat um → gleiche Verläufe wie "literatur"
+    "kleines_km": {"glucose": 10.0, "dt": 0.1, "setup": _small_km},
+}
+
+
+def make_model(scenario, record_history=True):
+    config = SCENARIOS[scenario]
+    model = GlycolysisPathway(glucose_conc=config["glucose"], record_history=record_history)
+    if config["setup"] is not None:
+        config["setup"](model)
+    return model
+
+
+def engines():                                                       # (Name, Aufruf) aller verfügbaren Engines/Backends
+    result = [
+        ("objects", lambda m, n, dt: m.simulate(n, dt)),
+        ("array/numpy", lambda m, n, dt: m.simulate(n, dt, engine="array", backend="numpy")),
+    ]
+    if importlib.util.find_spec("numba") is not None:
+        result.append(("array/numba", lambda m, n, dt: m.simulate(n, dt, engine="array", backend="numba")))
+    if importlib.util.find_spec("scipy") is not None:
+        result.append(("ode/bdf", lambda m, n, dt: m.simulate(n, dt, method="bdf")))
+    return result
+
+
+# Messungen
+
+
+def _measure(func, memory, setup=None):                              # Laufzeit und optional Spitzenspeicher (eigener Lauf, da tracemalloc die Laufzeit verfälscht)
+    # setup() wird vor jedem Lauf außerhalb der Zeitmessung aufgerufen (z.B. Modell erstellen), sein Ergebnis an func übergeben
+    arg = setup() if setup is not None else None
+    start = time.perf_counter()
+    func(arg)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        arg = setup() if setup is not None else None
+        tracemalloc.start()
+        func(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_construction(repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        GlycolysisPathway()
+    construct = (time.perf_counter() - start) / repeat
+    model = GlycolysisPathway()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.compile()
+    return {"construct_s": construct, "compile_s": (time.perf_counter() - start) / repeat}
+
+
+def bench_simulate(step_counts, scenarios, budget, memory):
+    results = []
+    for scenario in scenarios:
+        dt = SCENARIOS[scenario]["dt"]
+        for name, run in engines():
+            run(make_model(scenario), 10, dt)                        # Aufwärmen (u.a. Übersetzung des numba-Kerns)
+            over_budget = False
+            for steps in step_counts:
+                entry = {"kind": "simulate", "scenario": scenario, "engine": name, "steps": steps, "batch": 1}
+                if over_budget:                                      # vorherige Schrittzahl hat das Zeitbudget schon überschritten
+                    entry["skipped"] = True
+                    results.append(entry)
+                    continue
+                seconds, peak = _measure(lambda model: run(model, steps, dt), memory,       # Konstruktion nicht mitgemessen (siehe bench_construction)
+                                         setup=lambda: make_model(scenario, record_history=False))
+                entry.update(seconds=seconds, steps_per_s=steps / seconds, peak_bytes=peak)
+                results.append(entry)
+                print(f"{scenario:12s} {name:12s} steps={steps:>9d}  {steps / seconds:14.0f} Schritte/s", file=sys.stderr)
+                over_budget = seconds * 10 > budget                  # nächste Schrittzahl ist 10× größer
+    return results
+
+
+def bench_batch(batch_sizes, steps, scenarios, memory):
+    results = []
+    backends = ["numpy"] + (["numba"] if importlib.util.find_spec("numba") is not None else [])
+    for scenario in scenarios:
+        model = make_model(scenario)
+        base = model.parameters()
+        dt = SCENARIOS[scenario]["dt"]
+        rng = np.random.default_rng(0)
+        for backend in backends:
+            model.simulate_batch(base[None], steps=10, dt=dt, backend=backend)
+            for batch in batch_sizes:
+                params = base * rng.uniform(0.5, 2.0, (batch,) + base.shape)
+                seconds, peak = _measure(lambda _: model.simulate_batch(params, steps=steps, dt=dt, backend=backend), memory)
+                results.append({"kind": "batch", "scenario": scenario, "engine": f"batch/{backend}", "steps": steps,
+                                "batch": batch, "seconds": seconds, "steps_per_s": steps * batch / seconds, "peak_bytes": peak})
+                print(f"{scenario:12s} batch/{backend:6s} batch={batch:>6d}  {steps * batch / seconds:14.0f} Schritte/s", file=sys.stderr)
+    return results
+
+
+HEAVY_MODULES = ("scipy", "numba", "matplotlib", "graphviz", "streamlit", "pandas", "yaml")     # dürfen beim Import des Simulationskerns nicht geladen werden
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import Glykolyse_1
+from Glykolyse_1 import GlycolysisPathway
+GlycolysisPathway()
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": sorted(m for m in sys.modules if m.split(".")[0] in %r)}))
+"""
+
+
+def bench_import(budget, repeat=5):                                  # Startzeit in frischen Prozessen: Import des Kerns + erstes Modell (bester von repeat Läufen)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE % (HEAVY_MODULES,)], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        runs.append(json.loads(output))
+    seconds = min(r["seconds"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(f"Import Glykolyse_1: {seconds * 1000:.1f} ms (Budget {budget * 1000:.0f} ms), schwere Module: {loaded or '-'}", file=sys.stderr)
+    return {"seconds": seconds, "budget_s": budget, "heavy_modules": loaded, "passed": seconds <= budget and not loaded}
+
+
+# Genauigkeit: Referenzverläufe und Übereinstimmung der Engines
+
+
+def golden_rows(scenario):
+    model = make_model(scenario)
+    return model.simulate(GOLDEN_STEPS, SCENARIOS[scenario]["dt"]).data[GOLDEN_ROWS]
+
+
+def update_golden():
+    golden = {scenario: golden_rows(scenario).tolist() for scenario in SCENARIOS}
+    scenarios = list(golden)
+    for i, first in enumerate(scenarios):                            # Szenario ohne eigene Verläufe prüft nichts zusätzlich (z.B. Begrenzung verdeckt die Parameteränderung)
+        for second in scenarios[i + 1:]:
+            if golden[first] == golden[second]:
+                raise ValueError(f"Szenarien {first!r} und {second!r} liefern identische Referenzverläufe")
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+        json.dump({"steps": GOLDEN_STEPS, "rows": GOLDEN_ROWS, "scenarios": golden}, f)
+
+
+def check_accuracy():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = json.load(f)
+    results = []
+    for scenario in SCENARIOS:
+        dt = SCENARIOS[scenario]["dt"]
+        expected = np.array(golden["scenarios"][scenario])
+        for name, run in engines():
+            data = run(make_model(scenario), GOLDEN_STEPS, dt).data[GOLDEN_ROWS]
+            error = float(np.abs(data - expected).max())
+            exact = not name.startswith("ode/")                       # Euler-Engines müssen die Referenz reproduzieren, ODE-Löser werden nur berichtet
+            passed = bool(np.allclose(data, expected, rtol=GOLDEN_RTOL, atol=0.0)) if exact else None
+            results.append({"scenario": scenario, "engine": name, "max_abs_error": error, "passed": passed})
+    return results
+
+
+def compare(current, previous_path, threshold):                     # Durchsatzrückgang > threshold gegenüber früherer Messung
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    key = lambda r: (r["kind"], r["scenario"], r["engine"], r["steps"], r["batch"])
+    old = {key(r): r for r in previous["results"] if "steps_per_s" in r}
+    regressions = []
+    for entry in current["results"]:
+        before = old.get(key(entry))
+        if before is None or "steps_per_s" not in entry:
+            continue
+        ratio = entry["steps_per_s"] / before["steps_per_s"]
+        if ratio < 1.0 - threshold:
+            regressions.append({**{k: entry[k] for k in ("kind", "scenario", "engine", "steps", "batch")}, "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark für GlycolysisPathway.simulate")
+    parser.add_argument("--json", help="Ergebnis als JSON in diese Datei schreiben")
+    parser.add_argument("--steps", type=int, nargs="+", default=[10**k for k in range(2, 8)], help="Schrittzahlen (Standard: 1e2 … 1e7)")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 100, 10_000], help="Batch-Größen für simulate_batch")
+    parser.add_argument("--batch-steps", type=int, default=1000)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--budget", type=float, default=30.0, help="größere Schrittzahlen überspringen, wenn ein Lauf länger dauern würde (s)")
+    parser.add_argument("--no-memory", action="store_true", help="Spitzenspeicher nicht messen (halbiert die Laufzeit)")
+    parser.add_argument("--import-budget", type=float, default=0.5, help="erlaubte Importzeit von Glykolyse_1 in einem frischen Prozess (s)")
+    parser.add_argument("--compare", help="frühere JSON-Messung für den Regressionsvergleich")
+    parser.add_argument("--threshold", type=float, default=0.2, help="erlaubter Durchsatzrückgang beim Vergleich (Anteil)")
+    parser.add_argument("--update-golden", action="store_true", help="Referenzverläufe neu schreiben und beenden")
+    args = parser.parse_args(argv)
+
+    if args.update_golden:
+        update_golden()
+        return 0
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "numba": importlib.util.find_spec("numba") is not None,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "import": bench_import(args.import_budget),
+        "construction": bench_construction(),
+        "accuracy": check_accuracy(),
+        "results": bench_simulate(args.steps, args.scenarios, args.budget, not args.no_memory)
+                   + bench_batch(args.batch, args.batch_steps, args.scenarios, not args.no_memory),
+    }
+    failed = [r for r in report["accuracy"] if r["passed"] is False]
+    if not report["import"]["passed"]:
+        failed.append(report["import"])
+    if args.compare:
+        report["regressions"] = compare(report, args.compare, args.threshold)
+        failed += report["regressions"]
+
+    text = json.dumps(report, indent=1)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if failed else 0                                        # Exit-Code 1 bei Abweichung von der Referenz, Regression oder zu langsamem Import
+
+
+if __name__ == "__main__":
+    sys.exit(main())
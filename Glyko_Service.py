@@ -0,0 +1,358 @@
+# Asynchroner Simulationsdienst: Warteschlange, Worker-Pool, Zusammenfassen gleicher Anfragen und gemeinsamer Ergebnis-Cache
+#
+# Mehrere Oberflächen (z.B. alle Sitzungen der Streamlit-App) teilen sich einen Dienst:
+#   - Anfragen kommen in eine Warteschlange, gerechnet wird in einem Pool fester Größe (Prozesse oder Threads) → die CPU-Last hängt nicht von der Zahl der Nutzer ab
+#   - gleiche Anfragen, die gerade gerechnet werden, werden nur einmal gerechnet; alle Aufrufer erhalten dasselbe Ergebnis
+#   - Ergebnisse liegen in einem Cache mit Inhalts-Hash als Schlüssel (Stoffwechselweg, Glukose, dt, Parameter); längere Läufe setzen einen gespeicherten kürzeren fort
+#   - Läufe werden in Teilstücken gerechnet → Fortschritt (Job.progress) und Abbruch zwischen zwei Teilstücken
+#
+# Verwendung in asyncio-Code:
+#   async with SimulationService() as service:
+#       trajectory = await service.simulate(glucose, steps, dt, params)
+# Aus synchronem Code (z.B. Streamlit): ServiceThread startet den Dienst mit eigener Ereignisschleife in einem Hintergrund-Thread.
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from Glykolyse_1 import GLYCOLYSIS_SPEC, GlycolysisPathway, SimulationCache, Trajectory
+
+
+def _run_chunk(compiled, state, steps, dt):                          # Worker: steps Euler-Schritte ab state mit der kompilierten Form (pro Job einmal erstellt, nicht pro Teilstück)
+    out = np.empty((steps + 1, len(compiled.names)), dtype=np.float64)
+    compiled.run(state, steps, dt, out=out)
+    return out
+
+
+def _run_diagnostics(spec, glucose, params, steps, dt):              # Worker: objektbasierte Simulation mit Messung pro Reaktion (Instrumentation.as_dict())
+    model = GlycolysisPathway(record_history=False, spec=spec).with_params(params, glucose)
+    instrumentation = model.enable_instrumentation()
+    model.simulate(steps, dt)
+    return instrumentation.as_dict()
+
+
+# Auftrag: wird von allen Aufrufern mit derselben Anfrage geteilt
+
+
+class Job:
+
+    WAITING, RUNNING, DONE, CANCELLED, FAILED = "wartend", "läuft", "fertig", "abgebrochen", "fehler"
+
+
+    def __init__(self, key, glucose, steps, dt, params):
+        self.key = key                                               # Inhalts-Hash der Anfrage ohne steps (= Cache-Schlüssel)
+        self.glucose = float(glucose)
+        self.steps = int(steps)
+        self.dt = float(dt)
+        self.params = params
+        self.done = 0                                                # bereits gerechnete Schritte (auch aus anderen Threads lesbar)
+        self.status = Job.WAITING
+        self.subscribers = 1                                         # Anzahl Aufrufer, die auf das Ergebnis warten
+        self._future = asyncio.get_running_loop().create_future()
+        self._changed = asyncio.Event()
+
+
+    @property
+    def finished(self):
+        return self._future.done()
+
+
+    def _update(self, done=None, status=None):                       # neuer Fortschritt → wartende progress()-Generatoren wecken
+        if done is not None:
+            self.done = done
+        if status is not None:
+            self.status = status
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+    def _finish(self, trajectory=None, error=None):
+        if self._future.done():
+            return
+        if error is None:
+            self.done = self.steps
+            self._future.set_result(trajectory)
+            status = Job.DONE
+        elif isinstance(error, asyncio.CancelledError):
+            self._future.cancel()
+            status = Job.CANCELLED
+        else:
+            self._future.set_exception(error)
+            status = Job.FAILED
+        self._update(status=status)
+
+
+    async def result(self):                                          # wartet auf die Trajectory; wird nur dieser Aufrufer abgebrochen, läuft der gemeinsame Job weiter
+        return await asyncio.shield(self._future)
+
+
+    async def progress(self):                                        # async for done, steps in job.progress(): … → liefert jeden neuen Stand bis zum Ende des Jobs
+        while True:
+            changed = self._changed
+            yield self.done, self.steps
+            if self.finished:
+                return
+            await changed.wait()
+
+
+    def __repr__(self):
+        return f"Job({self.key[:12]}, {self.status}, {self.done}/{self.steps} Schritte, {self.subscribers} Aufrufer)"
+
+
+# Dienst
+
+
+class SimulationService:
+
+
+    def __init__(self, workers=None, spec=None, max_bytes=256 * 2**20, chunk_size=10_000, executor="process", mp_context="spawn",
+                 max_diagnostics=32):
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unbekannter executor: {executor!r} (erlaubt: 'process', 'thread')")
+        self.spec = GLYCOLYSIS_SPEC if spec is None else spec
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size                                 # Schritte pro Teilstück → Feinheit von Fortschritt und Abbruch
+        self.cache = SimulationCache(max_bytes)                      # LRU mit Speichergrenze; Schlüssel: Inhalts-Hash
+        self._model = GlycolysisPathway(record_history=False, spec=self.spec)   # Vorlage, aus der pro Job mit with_params eine Variante kopiert wird
+        self._model.compile()                                        # Struktur einmal übersetzen → alle Varianten teilen sie
+        self.names = [m.name for m in self._model.metabolites]
+        self._n_enzymes = len(self._model.enzymes)
+        self._spec_hash = hashlib.sha256(json.dumps(self.spec, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+        self.executor = executor                                     # "thread": kein eigener Prozess pro Worker; der numba-Kern gibt den GIL frei und rechnet trotzdem parallel
+        self._mp_context = mp_context                                # "spawn": sicher, auch wenn der Dienst aus einem Programm mit vielen Threads gestartet wird
+        self._inflight = {}                                          # (Schlüssel, steps) → laufender oder wartender Job
+        self.max_diagnostics = max_diagnostics
+        self._diagnostics = OrderedDict()                            # (Schlüssel, steps) → Messung pro Reaktion (LRU, höchstens max_diagnostics Einträge)
+        self._diagnostics_inflight = {}                              # (Schlüssel, steps) → laufende Messung (asyncio.Future)
+        self._queue = None
+        self._pool = None
+        self._dispatchers = []
+        self.stats = {"requests": 0, "cache_hits": 0, "deduplicated": 0, "computed_steps": 0, "diagnostics_runs": 0}
+
+
+    def key(self, glucose, dt, params):                              # Inhalts-Hash: gleiche Beschreibung, Glukose, dt und Parameter (bitgenau) → gleicher Schlüssel
+        params = np.ascontiguousarray(params, dtype="<f8")
+        return hashlib.sha256(self._spec_hash + struct.pack("<dd", glucose, dt) + params.tobytes()).hexdigest()
+
+
+    async def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            if self.executor == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="glyko-worker")
+            else:
+                context = multiprocessing.get_context(self._mp_context) if self._mp_context else None
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]   # ein Job pro Worker gleichzeitig
+        return self
+
+
+    async def close(self):                                           # bricht offene Jobs ab und beendet den Worker-Pool
+        if self._queue is None:
+            return
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        for job in list(self._inflight.values()):
+            job._finish(error=asyncio.CancelledError())
+        self._inflight.clear()
+        pool, self._pool, self._queue, self._dispatchers = self._pool, None, None, []
+        await asyncio.get_running_loop().run_in_executor(None, lambda: pool.shutdown(wait=True, cancel_futures=True))
+
+
+    async def __aenter__(self):
+        return await self.start()
+
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+    def _check(self, steps, params):                                 # gemeinsame Prüfung für submit und diagnostics
+        if self._queue is None:
+            raise RuntimeError("Dienst ist nicht gestartet (await service.start())")
+        params = np.array(params, dtype=np.float64)
+        if params.shape != (self._n_enzymes, 3):
+            raise ValueError(f"params muss die Form ({self._n_enzymes}, 3) haben (kcat, enzyme_conc, km)")
+        if steps < 0:
+            raise ValueError("steps muss >= 0 sein")
+        return params
+
+
+    def _glucose(self, glucose):                                     # Stoffwechselwege ohne Metabolit 'glucose' → Wert wird ignoriert (Anfangswerte der Beschreibung)
+        return float(glucose) if hasattr(self._model, "glucose") else None
+
+
+    def submit(self, glucose, steps, dt, params):                    # Anfrage einreihen → Job (sofort fertig bei Cache-Treffer, geteilt bei gleicher laufender Anfrage)
+        params = self._check(steps, params)
+        key = self.key(float(glucose), float(dt), params)
+        self.stats["requests"] += 1
+        job = self._inflight.get((key, int(steps)))
+        if job is not None:
+            job.subscribers += 1
+            self.stats["deduplicated"] += 1
+            return job
+        job = Job(key, glucose, steps, dt, params)
+        cached = self.cache.head(key, job.steps)                     # Anfangsstück eines gespeicherten, mindestens so langen Laufs
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            job._finish(cached)
+            return job
+        self._inflight[(key, job.steps)] = job
+        self._queue.put_nowait(job)
+        return job
+
+
+    def cancel(self, job):                                           # ein Aufrufer gibt den Job auf; abgebrochen wird erst, wenn kein Aufrufer mehr wartet
+        if job.finished:
+            return
+        job.subscribers -= 1
+        if job.subscribers <= 0:
+            self._inflight.pop((job.key, job.steps), None)
+            job._finish(error=asyncio.CancelledError())
+
+
+    async def simulate(self, glucose, steps, dt, params):            # submit und auf das Ergebnis warten; Abbruch des Aufrufers gibt den Job frei
+        job = self.submit(glucose, steps, dt, params)
+        try:
+            return await job.result()
+        except asyncio.CancelledError:
+            self.cancel(job)
+            raise
+
+
+    async def diagnostics(self, glucose, steps, dt, params):         # Messung pro Reaktion (objektbasierte Simulation) im Worker-Pool; Ergebnisse gespeichert, gleiche laufende Anfragen geteilt
+        params = self._check(steps, params)
+        key = (self.key(float(glucose), float(dt), params), int(steps))
+        if key in self._diagnostics:
+            self._diagnostics.move_to_end(key)                       # zuletzt benutzt
+            return self._diagnostics[key]
+        future = self._diagnostics_inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._pool, _run_diagnostics, self.spec, self._glucose(glucose), params, int(steps), float(dt))
+            self._diagnostics_inflight[key] = future
+            future.add_done_callback(lambda _: self._diagnostics_inflight.pop(key, None))
+            self.stats["diagnostics_runs"] += 1
+        result = await asyncio.shield(future)                        # Abbruch eines Aufrufers beendet die Messung nicht (sie ist kurz und wird gespeichert)
+        self._diagnostics[key] = result
+        while len(self._diagnostics) > self.max_diagnostics:
+            self._diagnostics.popitem(last=False)
+        return result
+
+
+    async def _dispatch(self):                                       # holt Jobs aus der Warteschlange, bis der Dienst geschlossen wird
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.finished:                                 # abgebrochene Jobs werden übersprungen
+                    await self._run(job)
+            except asyncio.CancelledError:
+                job._finish(error=asyncio.CancelledError())
+                raise
+            except Exception as exc:
+                job._finish(error=exc)
+            finally:
+                if self._inflight.get((job.key, job.steps)) is job:
+                    del self._inflight[(job.key, job.steps)]
+                self._queue.task_done()
+
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        job._update(status=Job.RUNNING)
+        model = self._model.with_params(job.params, self._glucose(job.glucose))
+        compiled = model.compile()                                   # einmal pro Job; alle Teilstücke rechnen mit denselben Arrays
+        parts, state, done = [], model.state(), 0
+        head = self.cache.head(job.key, job.steps)                   # evtl. inzwischen von einem anderen Job gerechnet
+        if head is not None:
+            job._finish(head)
+            return
+        cached = self.cache.get(job.key)
+        if cached is not None:                                       # nur steps wurde erhöht → vom gespeicherten Endzustand aus weiterrechnen
+            parts, state, done = [cached.data], cached.data[-1], len(cached.data) - 1
+        while done < job.steps or not parts:
+            n = min(self.chunk_size, job.steps - done)
+            data = await loop.run_in_executor(self._pool, _run_chunk, compiled, state, n, job.dt)
+            if job.finished:                                         # während des Teilstücks abgebrochen → Ergebnis verwerfen
+                return
+            parts.append(data[1:] if parts else data)                # Anfangszeile ist die letzte Zeile des vorherigen Teilstücks
+            state, done = data[-1], done + n
+            self.stats["computed_steps"] += n
+            job._update(done=done)
+        data = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        trajectory = Trajectory(self.names, data, job.dt)
+        self.cache.store(job.key, trajectory)
+        job._finish(trajectory)
+
+
+# Synchroner Zugang für Programme ohne eigene Ereignisschleife
+
+
+class ServiceThread:
+
+
+    def __init__(self, **kwargs):                                    # kwargs → SimulationService (workers, spec, max_bytes, chunk_size, …)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="glyko-service", daemon=True)
+        self._thread.start()
+        self.service = SimulationService(**kwargs)
+        self._call(self.service.start())
+
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+    async def _submit(self, *args):
+        return self.service.submit(*args)
+
+
+    def submit(self, glucose, steps, dt, params):                    # → Job; Fortschritt über job.done / job.steps
+        return self._call(self._submit(glucose, steps, dt, params))
+
+
+    def diagnostics(self, glucose, steps, dt, params, timeout=None): # Messung pro Reaktion, gerechnet im Worker-Pool des Dienstes
+        return self._call(self.service.diagnostics(glucose, steps, dt, params), timeout)
+
+
+    def simulate(self, glucose, steps, dt, params, progress=None, poll=0.1, timeout=None):
+        # wartet auf das Ergebnis; progress(done, steps) wird dabei im Thread des Aufrufers aufgerufen (z.B. für einen Fortschrittsbalken)
+        # wird das Warten unterbrochen (Ausnahme, Timeout, Neustart des Streamlit-Skripts), gibt der Aufrufer den Job frei
+        job = self.submit(glucose, steps, dt, params)
+        future = asyncio.run_coroutine_threadsafe(job.result(), self.loop)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    return future.result(poll)
+                except FutureTimeoutError:
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise TimeoutError(f"Simulation nach {timeout} s nicht fertig") from None
+                    if progress is not None:
+                        progress(job.done, job.steps)
+        finally:
+            if not future.done():
+                future.cancel()
+                self.loop.call_soon_threadsafe(self.service.cancel, job)
+
+
+    @property
+    def stats(self):
+        return dict(self.service.stats)
+
+
+    def close(self):
+        self._call(self.service.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,189 @@
+# Spaltenweises Speicherformat für Simulationsergebnisse
+#
+# Ein Lauf wird als Verzeichnis gespeichert:
+#   meta.json        → Metabolitnamen, dt, stride, Startschritt, Anzahl Zeilen, Enzymparameter
+#   <i>.npy          → eine float64-Spalte pro Metabolit (Standard-.npy, lesbar mit np.load)
+# Jede Spalte liegt zusammenhängend auf der Festplatte → einzelne Metabolite oder Zeitfenster
+# können über Memory-Mapping gelesen werden, ohne den ganzen Lauf zu laden.
+
+from collections.abc import Mapping
+import json
+import os
+import struct
+
+import numpy as np
+
+from Glykolyse_1 import Trajectory
+
+
+FORMAT_VERSION = 1
+_HEADER_BYTES = 128                                                  # feste Länge des .npy-Headers → Zeilenzahl kann beim Anhängen überschrieben werden
+
+
+def _npy_header(rows):                                               # .npy-Header (Version 1.0) für eine float64-Spalte, mit Leerzeichen auf feste Länge aufgefüllt
+    header = repr({"descr": "<f8", "fortran_order": False, "shape": (rows,)})
+    header = header.ljust(_HEADER_BYTES - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+# Schreiben (auch schrittweise während einer laufenden Simulation)
+
+
+class TrajectoryWriter:
+
+
+    def __init__(self, path, names, dt, stride=1, start=0, pathway=None, overwrite=False):
+        # vorhandener Lauf in path → FileExistsError (Weiterschreiben mit resume), overwrite=True ersetzt ihn vollständig
+        if os.path.exists(os.path.join(path, "meta.json")) and not overwrite:
+            raise FileExistsError(f"{path} enthält bereits einen gespeicherten Lauf (overwrite=True zum Ersetzen, TrajectoryWriter.resume zum Weiterschreiben)")
+        self.path = path
+        self.meta = {
+            "format": "glykolyse-trajectory",
+            "version": FORMAT_VERSION,
+            "names": list(names),
+            "dt": float(dt),
+            "stride": int(stride),
+            "start": int(start),
+            "rows": 0,
+        }
+        if pathway is not None:                                      # Enzymparameter als Metadaten (Spalten kcat, enzyme_conc, km)
+            self.meta["enzymes"] = [e.name for e in pathway.enzymes]
+            self.meta["parameters"] = pathway.parameters().tolist()
+        os.makedirs(path, exist_ok=True)
+        for entry in os.listdir(path):                               # Spalten eines früheren Laufs mit mehr Metaboliten entfernen
+            stem, ext = os.path.splitext(entry)
+            if ext == ".npy" and stem.isdigit() and int(stem) >= len(self.meta["names"]):
+                os.remove(os.path.join(path, entry))
+        self._files = []
+        for i in range(len(self.meta["names"])):
+            f = open(os.path.join(path, f"{i}.npy"), "w+b")
+            f.write(_npy_header(0))
+            self._files.append(f)
+        self._write_meta()
+
+
+    @classmethod
+    def resume(cls, path, rows=None):                                # öffnet einen vorhandenen Lauf zum Weiterschreiben; rows (z.B. Checkpoint.rows) → später geschriebene Zeilen werden verworfen
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != "glykolyse-trajectory":
+            raise ValueError(f"{path} ist keine gespeicherte Glykolyse-Trajektorie")
+        rows = meta["rows"] if rows is None else int(rows)
+        if rows > meta["rows"]:
+            raise ValueError(f"{path} enthält nur {meta['rows']} Zeilen, verlangt werden {rows}")
+        writer = cls.__new__(cls)
+        writer.path = path
+        writer.meta = meta
+        writer._files = []
+        for i in range(len(meta["names"])):
+            f = open(os.path.join(path, f"{i}.npy"), "r+b")
+            f.truncate(_HEADER_BYTES + 8 * rows)                     # Zeilen nach der Momentaufnahme abschneiden
+            f.seek(0)
+            f.write(_npy_header(rows))
+            f.flush()
+            writer._files.append(f)
+        writer.meta["rows"] = rows
+        writer._write_meta()
+        return writer
+
+
+    def append(self, chunk):                                         # hängt Zeilen an (Array (Zeilen, Metabolite) oder Trajectory, z.B. aus iter_simulate)
+        data = np.asarray(chunk.data if isinstance(chunk, Trajectory) else chunk, dtype="<f8")
+        if data.ndim != 2 or data.shape[1] != len(self._files):
+            raise ValueError(f"chunk muss die Form (Zeilen, {len(self._files)}) haben")
+        rows = self.meta["rows"] + len(data)
+        for i, f in enumerate(self._files):
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(data[:, i]).tobytes())
+            f.seek(0)
+            f.write(_npy_header(rows))                               # neue Länge in den Header schreiben
+            f.flush()
+        self.meta["rows"] = rows
+        self._write_meta()                                           # meta.json zuletzt → gibt nur vollständig geschriebene Zeilen frei
+
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+
+    def close(self):
+        for f in self._files:
+            f.close()
+        self._files = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_trajectory(path, trajectory, pathway=None, overwrite=False):   # speichert eine vollständige Trajectory (z.B. Ergebnis von simulate)
+    with TrajectoryWriter(path, trajectory.names, trajectory.dt, trajectory.stride,
+                          getattr(trajectory, "start", 0), pathway, overwrite) as writer:
+        writer.append(trajectory.data)
+
+
+# Lesen über Memory-Mapping
+
+
+class StoredTrajectory(Mapping):
+
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != "glykolyse-trajectory":
+            raise ValueError(f"{path} ist keine gespeicherte Glykolyse-Trajektorie")
+        self.path = path
+        self.names = self.meta["names"]
+        self.dt = self.meta["dt"]
+        self.stride = self.meta["stride"]
+        self.start = self.meta["start"]
+        self.rows = self.meta["rows"]
+        self.parameters = np.array(self.meta["parameters"]) if "parameters" in self.meta else None
+        self._columns = {name: i for i, name in enumerate(self.names)}
+        self._maps = {}                                              # bereits geöffnete Spalten
+
+
+    def column(self, i):                                             # Spalte i als schreibgeschütztes Memory-Map (wird erst beim Zugriff gelesen)
+        if i not in self._maps:
+            self._maps[i] = np.load(os.path.join(self.path, f"{i}.npy"), mmap_mode="r")[:self.rows]
+        return self._maps[i]
+
+
+    def __getitem__(self, name):
+        return self.column(self._columns[name])
+
+
+    def __iter__(self):
+        return iter(self.names)
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    @property
+    def time(self):
+        return (self.start + np.arange(self.rows) * self.stride) * self.dt
+
+
+    def window(self, begin=0, end=None, names=None):                # Zeilen begin:end als Trajectory; nur die angeforderten Metabolite werden gelesen
+        names = self.names if names is None else list(names)
+        end = self.rows if end is None else min(end, self.rows)
+        data = np.column_stack([self[name][begin:end] for name in names]) if end > begin else np.empty((0, len(names)))
+        return Trajectory(names, data, self.dt, self.stride, start=self.start + begin * self.stride)
+
+
+    def __repr__(self):
+        return f"StoredTrajectory({self.path!r}, {self.rows} Zeilen × {len(self.names)} Metabolite, dt={self.dt})"
+
+
+def load_trajectory(path):
+    return StoredTrajectory(path)
@@ -0,0 +1,135 @@
+# Parallele Parameterstudien und Monte-Carlo-Ensembles über einen Prozesspool
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import os
+
+import numpy as np
+
+from Glykolyse_1 import Checkpoint, GlycolysisPathway
+
+
+# Hilfsfunktionen für den Austausch der Ergebnisse über Shared Memory
+
+
+def _to_shared(array):                                               # Worker: Ergebnisarray in einen Shared-Memory-Block kopieren → nur Name, Form übertragen
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=np.float64, buffer=shm.buf)[...] = array
+    resource_tracker.unregister(shm._name, "shared_memory")         # Freigabe übernimmt der Hauptprozess (sonst löscht der Worker den Block beim Beenden)
+    name = shm.name
+    shm.close()
+    return name, array.shape
+
+
+def _from_shared(name, shape):                                       # Hauptprozess: Block lesen, als normales Array zurückgeben und freigeben
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.array(np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _collect(handles):                                               # Ergebnis eines Workers: ein Array oder (Ergebnis, flux) bei accounting=True
+    arrays = [_from_shared(*handle) for handle in handles]
+    return arrays[0] if len(arrays) == 1 else tuple(arrays)
+
+
+# Worker-Funktionen (Top-Level, damit sie an die Prozesse übergeben werden können)
+
+
+def _model(spec, checkpoint):                                        # Ausgangsmodell: Anfangswerte der Beschreibung oder Zustand und Parameter einer Momentaufnahme
+    model = GlycolysisPathway(record_history=False, spec=spec)
+    if checkpoint is not None:
+        model.restore(checkpoint)
+    return model
+
+
+def _sweep_chunk(params, glucose, steps, dt, stride, spec, checkpoint, accounting):   # Simuliert einen Block von Parametersätzen vektorisiert mit simulate_batch
+    result = _model(spec, checkpoint).simulate_batch(params, glucose, steps=steps, dt=dt, stride=stride, accounting=accounting)
+    return [_to_shared(array) for array in (result if accounting else (result,))]
+
+
+def _monte_carlo_chunk(start, stop, seed, sigma, glucose, steps, dt, stride, spec, checkpoint, accounting):
+    model = _model(spec, checkpoint)
+    base = model.parameters()
+    params = np.empty((stop - start,) + base.shape)
+    for i, run in enumerate(range(start, stop)):                     # eigener Zufallsgenerator pro Lauf → Ergebnis unabhängig von Blockgröße und Anzahl Worker
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(run,)))
+        params[i] = base * rng.lognormal(0.0, sigma, base.shape)     # multiplikative Streuung von kcat, [E] und Km
+    result = model.simulate_batch(params, glucose, steps=steps, dt=dt, stride=stride, accounting=accounting)
+    return [_to_shared(array) for array in (result if accounting else (result,))]
+
+
+# Verteilung der Arbeit auf den Prozesspool
+
+
+def _run_ordered(tasks, workers, max_pending):                      # reicht Aufgaben ein und liefert die Ergebnisse in Reihenfolge der Aufgaben
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or 2 * workers                         # begrenzte Anzahl gleichzeitig offener Blöcke → begrenzter Speicher
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        try:
+            for start, func, args in tasks:
+                pending.append((start, pool.submit(func, *args)))
+                if len(pending) >= max_pending:
+                    start, future = pending.pop(0)
+                    yield start, _collect(future.result())
+            while pending:
+                start, future = pending.pop(0)
+                yield start, _collect(future.result())
+        finally:
+            for _, future in pending:                                # bei Abbruch durch den Aufrufer: offene Blöcke verwerfen und freigeben
+                if not future.cancel() and future.exception() is None:
+                    _collect(future.result())
+
+
+def _load(checkpoint):                                               # Pfad → Checkpoint (wird einmal gelesen und als kleines Objekt an die Worker übergeben)
+    return Checkpoint.load(checkpoint) if isinstance(checkpoint, (str, os.PathLike)) else checkpoint
+
+
+def iter_sweep(params, glucose=None, steps=100, dt=0.1, stride=1, chunk_size=256, workers=None, max_pending=None, spec=None, checkpoint=None,
+               accounting=False):
+    # Generator: liefert (Startindex, Ergebnis (chunk, Zeit, Metabolite)) in der Reihenfolge der Parametersätze
+    # accounting=True → (Startindex, (Ergebnis, flux)) mit der umgesetzten Stoffmenge pro Lauf und Reaktion wie bei simulate_batch
+    # checkpoint (Checkpoint oder Pfad): alle Läufe starten im gespeicherten Zustand, z.B. nach einer Einschwingphase, die nur einmal gerechnet wurde
+    # glucose=None → Glukose aus dem Anfangszustand (Standard 10 mM bzw. Wert der Momentaufnahme)
+    params = np.asarray(params, dtype=np.float64)
+    if glucose is not None:
+        glucose = np.broadcast_to(np.asarray(glucose, dtype=np.float64), params.shape[:1])
+    checkpoint = _load(checkpoint)
+    tasks = (
+        (start, _sweep_chunk, (params[start:start + chunk_size], None if glucose is None else glucose[start:start + chunk_size],
+                               steps, dt, stride, spec, checkpoint, accounting))
+        for start in range(0, len(params), chunk_size)
+    )
+    yield from _run_ordered(tasks, workers, max_pending)
+
+
+def iter_monte_carlo(runs, sigma=0.2, seed=0, glucose=None, steps=100, dt=0.1, stride=1,
+                     chunk_size=256, workers=None, max_pending=None, spec=None, checkpoint=None, accounting=False):
+    # Generator für Monte-Carlo-Ensembles: Parameter werden deterministisch aus seed in den Workern erzeugt (keine Übertragung der Parameter)
+    # mit checkpoint streuen die Parameter um die Werte der Momentaufnahme, Start im gespeicherten Zustand
+    # glucose: ein Wert für alle Läufe oder ein Wert pro Lauf (runs,) wie bei iter_sweep
+    if glucose is not None:
+        glucose = np.broadcast_to(np.asarray(glucose, dtype=np.float64), (runs,))
+    checkpoint = _load(checkpoint)
+    tasks = (
+        (start, _monte_carlo_chunk, (start, min(start + chunk_size, runs), seed, sigma, None if glucose is None else glucose[start:start + chunk_size],
+                                     steps, dt, stride, spec, checkpoint, accounting))
+        for start in range(0, runs, chunk_size)
+    )
+    yield from _run_ordered(tasks, workers, max_pending)
+
+
+def run_sweep(params, glucose=None, steps=100, dt=0.1, stride=1, chunk_size=256, workers=None, spec=None, checkpoint=None, accounting=False):
+    # Sammelt alle Blöcke von iter_sweep in einem Array (batch, Zeit, Metabolite); accounting=True → (Ergebnis, flux (batch, Reaktionen))
+    chunks = [result for _, result in iter_sweep(params, glucose, steps, dt, stride, chunk_size, workers, spec=spec, checkpoint=checkpoint,
+                                                 accounting=accounting)]
+    if not chunks:
+        model = GlycolysisPathway(spec=spec)
+        result = np.empty((0, steps // stride + 1, len(model.metabolites)))
+        return (result, np.empty((0, len(model.reactions)))) if accounting else result
+    if accounting:
+        return np.concatenate([result for result, _ in chunks]), np.concatenate([flux for _, flux in chunks])
+    return np.concatenate(chunks)
@@ -1,5 +1,16 @@
 # Importieren der Bibliotheken 
 
+from collections import OrderedDict
+from collections.abc import Mapping
+import copy
+import functools
+import importlib.util
+import keyword
+import os
+import struct
+import threading
+import time
+
 import numpy as np   # numpy --> numerische Berechnungen
 
 
@@ -9,17 +20,20 @@ import numpy as np   # numpy --> numerische Berechnungen
 
 
 class Metabolite:                               # Modelliert Metaboliten in biochemischen Netzwerk 
+    __slots__ = ("name", "conc", "history", "record_history")   # feste Attribute statt __dict__ → weniger Speicher, schnellere Zugriffe
     
     
-    def __init__(self, name, initial_conc):              # Erstellung Metabolit
+    def __init__(self, name, initial_conc, record_history=True):              # Erstellung Metabolit
         self.name = name                        # Name Molekül
         self.conc = initial_conc                # Ausgangskonzentration (mMol/L)
         self.history = [initial_conc]           # Speicherung der Werte
+        self.record_history = record_history    # False → keine Speicherung in history (Verlauf steht in der Trajectory von simulate)
     
     def update_conc(self, delta):               # Aktualisiert Konzentration der Metaboliten basierend auf delta
         self.conc += delta                      # Veränderung Konzentration um delta
         self.conc = max(self.conc, 0)           # Sicherstellen dass Konzentration nicht < 0
-        self.history.append(self.conc)          # Speichern der Konzentration für spätere Darstellung
+        if self.record_history:
+            self.history.append(self.conc)      # Speichern der Konzentration für spätere Darstellung
         
     def __repr__(self):                            # Darstellung von Objekt als Text
         return f"{self.name}: {self.conc:.3f} mM"  # formatierter String mit Name des Metaboliten mit Konzentration auf 3 Dezimalstellen
@@ -29,21 +43,48 @@ class Metabolite:                               # Modelliert Metaboliten in bioc
 
 
 class Enzyme:                                   # Enzym Klasse mit Name,Turnover number (kcat), Enzymkonzentration und Michaelis-Menten-Konstante (km)
+    __slots__ = ("name", "_kcat", "_enzyme_conc", "_vmax", "km")
    
     
     def __init__(self, name, kcat, enzyme_conc, km=1.0):
         self.name = name
-        self.enzyme_conc = enzyme_conc         # Schätzung von Enzymaktivität und Zellvolumen in mMol
-        self.kcat = kcat                       # kcat (Turnover Number) in 1/s
-        self.vmax = kcat * enzyme_conc         # Berechnung vmax (maximale Reaktionsgeschwindigkeit) aus kcat und Enzymkonzentration in mMol/s
+        self._enzyme_conc = enzyme_conc        # Schätzung von Enzymaktivität und Zellvolumen in mMol
+        self.kcat = kcat                       # kcat (Turnover Number) in 1/s; setzt auch vmax
         self.km = km                           # km in mMol
 
+
+    @property
+    def kcat(self):
+        return self._kcat
+
+
+    @kcat.setter
+    def kcat(self, value):                     # jede Änderung von kcat oder [E] berechnet vmax neu → vmax kann nicht veralten
+        self._kcat = value
+        self._vmax = value * self._enzyme_conc
+
+
+    @property
+    def enzyme_conc(self):
+        return self._enzyme_conc
+
+
+    @enzyme_conc.setter
+    def enzyme_conc(self, value):
+        self._enzyme_conc = value
+        self._vmax = self._kcat * value
+
+
+    @property
+    def vmax(self):                            # vmax (maximale Reaktionsgeschwindigkeit) = kcat * Enzymkonzentration in mMol/s; nur lesbar
+        return self._vmax
+
     
     def rate(self, substrate_conc):            # Berechnung Enzymgeschwindigkeit basierend auf der Substratkonzentration nach Michaelis-Menten
         
         s = substrate_conc              
         if s > 0:                              # wenn Substrat > 0 berechne die Geschwindigkeit (vmax) nach Michaelis-Menten 
-            return self.vmax * s / (self.km + s)  # Berechnung nach Michaelis-Menten-Gleichung
+            return self._vmax * s / (self.km + s)  # Berechnung nach Michaelis-Menten-Gleichung
         else:
             return 0                           # Substrat < 0 --> Geschwindigkeit = 0 --> keine negative Geschwindigkeit
    
@@ -57,6 +98,7 @@ class Enzyme:                                   # Enzym Klasse mit Name,Turnover
 
 
 class Reaction:
+    __slots__ = ("name", "substrate", "product", "enzyme")
     
     
     def __init__(self, name, substrate, product, enzyme):                                      # initialisiert enzymkatalysierte Reaktion
@@ -76,6 +118,12 @@ class Reaction:
         delta = min(delta, self.substrate.conc)                    # sicherstellen, dass nur so viel Substrat umgesetzt wird wie tatsächlich vorhanden ist
         self.substrate.update_conc(-delta)                         # Abnahme der Substratkonzentration um delta
         self.product.update_conc(delta)                            # Zunahme der Produktkonzentration um delta
+        return delta                                               # umgesetzte Stoffmenge (für die Flussbilanz)
+
+
+    @property
+    def products(self):                                            # einheitlicher Zugriff auf alle Produkte (für die kompilierte Form des Stoffwechselwegs)
+        return (self.product,)
 
 
     def __repr__(self):
@@ -86,6 +134,7 @@ class Reaction:
 
 
 class SplitReaction:                                                
+    __slots__ = ("name", "substrate", "product1", "product2", "enzyme")
     
     
     def __init__(self, name, substrate, product1, product2, enzyme):
@@ -107,236 +156,995 @@ class SplitReaction:
         self.substrate.update_conc(-delta)                          
         self.product1.update_conc(delta)                            # Zunahme beider Produkte um delta --> korrektes Verhältnis der Umsetzung aus Fruktose-1,6-bisphosphat → Dihydroxyacetonphosphat + Glycerinaldehyd-3-phosphat
         self.product2.update_conc(delta)
+        return delta
+
+
+    @property
+    def products(self):
+        return (self.product1, self.product2)
 
 
     def __repr__(self):
         return f"SplitReaction({self.name}, Enzyme={self.enzyme})"
 
 
+# Deklarative Beschreibung des Stoffwechselwegs → Metabolite, Enzyme und Reaktionen als Daten (dict/JSON/YAML) statt fest programmierter Attribute
+# ids werden zu Attributnamen von GlycolysisPathway (z.B. model.glucose, model.hexokinase)
+
+
+GLYCOLYSIS_SPEC = {
+    "name": "Glykolyse",
+    "metabolites": [                                                                      # Metabolite mit spezifischen Namen und Ausgangskonzentrationen (alle starten bei 0 außer Glukose); carbons = C-Atome für die Kohlenstoffbilanz
+        {"id": "glucose", "name": "Glukose", "initial_conc": 10.0, "carbons": 6},
+        {"id": "g6p", "name": "Glukose-6-phosphat", "initial_conc": 0.0, "carbons": 6},
+        {"id": "f6p", "name": "Fruktose-6-phosphat", "initial_conc": 0.0, "carbons": 6},
+        {"id": "f1_6bp", "name": "Fruktose-1,6-bisphosphat", "initial_conc": 0.0, "carbons": 6},
+        {"id": "dhap", "name": "Dihydroxyacetonphosphat", "initial_conc": 0.0, "carbons": 3},
+        {"id": "g3p", "name": "Glycerinaldehyd-3-phosphat", "initial_conc": 0.0, "carbons": 3},
+        {"id": "bpg_1_3", "name": "1,3-Bisphosphoglycerat", "initial_conc": 0.0, "carbons": 3},
+        {"id": "pg_3", "name": "3-Phosphoglycerat", "initial_conc": 0.0, "carbons": 3},
+        {"id": "pg_2", "name": "2-Phosphoglycerat", "initial_conc": 0.0, "carbons": 3},
+        {"id": "pep", "name": "Phosphoenolpyruvat", "initial_conc": 0.0, "carbons": 3},
+        {"id": "pyruvate", "name": "Pyruvat", "initial_conc": 0.0, "carbons": 3},
+    ],
+    "enzymes": [                                                                          # Enzyme mit Namen, Turnover Number (kcat), typischen Enzymkonzentrationen sowie Michaelis-Menten-Konstante(km) → Annäherungswerte aus der Literatur → Anpassung über streamlit
+        {"id": "hexokinase", "name": "Hexokinase", "kcat": 200, "enzyme_conc": 0.0025, "km": 0.05},
+        {"id": "isomerase", "name": "Glukose-6-phosphat-Isomerase", "kcat": 150, "enzyme_conc": 0.002, "km": 0.1},
+        {"id": "pfk", "name": "Phosphofructokinase", "kcat": 300, "enzyme_conc": 0.002, "km": 0.08},
+        {"id": "aldolase", "name": "Aldolase", "kcat": 100, "enzyme_conc": 0.0015, "km": 0.03},
+        {"id": "triosephosphat_isomerase", "name": "Triosephosphatisomerase", "kcat": 4300, "enzyme_conc": 0.002, "km": 0.6},
+        {"id": "gapdh", "name": "Glycerinaldehyd-3-phosphat-Dehydrogenase", "kcat": 250, "enzyme_conc": 0.002, "km": 0.02},
+        {"id": "pgk", "name": "3-Phosphoglyceratkinase", "kcat": 300, "enzyme_conc": 0.002, "km": 0.2},
+        {"id": "pgm", "name": "Phosphoglyceratmutase", "kcat": 100, "enzyme_conc": 0.002, "km": 0.15},
+        {"id": "enolase", "name": "Enolase", "kcat": 200, "enzyme_conc": 0.002, "km": 0.07},
+        {"id": "pyruvate_kinase", "name": "Pyruvat-Kinase", "kcat": 350, "enzyme_conc": 0.002, "km": 0.07},
+    ],
+    "reactions": [                                                                        # Reaktionen definieren Ablauf aus Literatur; Umsetzung Substrat zu Produkt(en) durch Enzym; atp/nadh = Bildung (+) bzw. Verbrauch (-) pro Umsatz; reversible nur für das Diagramm
+        {"substrate": "glucose", "products": ["g6p"], "enzyme": "hexokinase", "atp": -1, "reversible": False},
+        {"substrate": "g6p", "products": ["f6p"], "enzyme": "isomerase", "reversible": True},
+        {"substrate": "f6p", "products": ["f1_6bp"], "enzyme": "pfk", "atp": -1, "reversible": False},
+        {"substrate": "f1_6bp", "products": ["dhap", "g3p"], "enzyme": "aldolase", "reversible": True},
+        {"substrate": "dhap", "products": ["g3p"], "enzyme": "triosephosphat_isomerase", "reversible": True},
+        {"substrate": "g3p", "products": ["bpg_1_3"], "enzyme": "gapdh", "nadh": 1, "reversible": True},
+        {"substrate": "bpg_1_3", "products": ["pg_3"], "enzyme": "pgk", "atp": 1, "reversible": False},
+        {"substrate": "pg_3", "products": ["pg_2"], "enzyme": "pgm", "reversible": True},
+        {"substrate": "pg_2", "products": ["pep"], "enzyme": "enolase", "reversible": True},
+        {"substrate": "pep", "products": ["pyruvate"], "enzyme": "pyruvate_kinase", "atp": 1, "reversible": False},
+    ],
+}
+
+
+def load_spec(path):                                                                      # lädt eine Beschreibung des Stoffwechselwegs aus einer JSON- oder YAML-Datei
+    path = os.fspath(path)                                                                # auch pathlib.Path
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml                                                               # optionale Abhängigkeit, nur für YAML-Dateien
+            except ImportError as exc:
+                raise ImportError("YAML-Dateien benötigen PyYAML (pip install pyyaml)") from exc
+            return yaml.safe_load(f)
+        import json
+        return json.load(f)
+
+
 # Klasse für den Stoffwechselweg, mit allen Metaboliten, Enzymen und den jeweiligen Reaktionen
 
 
 class GlycolysisPathway:
+
+    _ATTRIBUTES = ("spec", "reactions", "metabolites", "_metabolite_ids", "enzymes", "instrumentation",   # von _setup gesetzte Attribute → nicht als id erlaubt
+                   "_clone_layout", "_compiled", "carbons", "atp", "nadh")
     
     
-    def __init__(self, glucose_conc=10.0):             # Übergabe Anfangskonzentration von Glukose (10mMol/L); Platzhalter: kann in Streamlit angepasst werden oder beim Erstellen eines Objekts der Klasse 
-        self.glucose = Metabolite(
-            name="Glukose", 
-            initial_conc=glucose_conc
-        )                                              # definieren der Metabolite mit spezifischen Namen und Ausgangskonzentrationen (alle starten bei 0 außer Glukose)                         
-        self.g6p = Metabolite(
-            name="Glukose-6-phosphat",
-            initial_conc=0.0
-        )
-        self.f6p = Metabolite(
-            name="Fruktose-6-phosphat",
-            initial_conc=0.0
-        )
-        self.f1_6bp = Metabolite(
-            name="Fruktose-1,6-bisphosphat",
-            initial_conc=0.0
-        )
-        self.dhap = Metabolite(
-            name="Dihydroxyacetonphosphat",
-            initial_conc=0.0
-        )
-        self.g3p = Metabolite(
-            name="Glycerinaldehyd-3-phosphat",
-            initial_conc=0.0
-        )
-        self.bpg_1_3 = Metabolite(
-            name="1,3-Bisphosphoglycerat", 
-            initial_conc=0.0
-        )
-        self.pg_3 = Metabolite(
-            name="3-Phosphoglycerat", 
-            initial_conc=0.0
-        )
-        self.pg_2 = Metabolite(
-            name="2-Phosphoglycerat", 
-            initial_conc=0.0
-        )
-        self.pep = Metabolite(
-            name="Phosphoenolpyruvat", 
-            initial_conc=0.0
-        )
-        self.pyruvate = Metabolite(
-            name="Pyruvat", 
-            initial_conc=0.0
-        ) 
-                                                      # definieren der Enzyme mit Namen, Turnover Number (kcat), typischen Enzymkonzentrationen sowie Michaelis-Menten-Konstante(km) → Annäherungswerte aus der Literatur → Anpassung über streamlit
-        self.hexokinase = Enzyme(
-            name="Hexokinase", 
-            kcat=200, 
-            enzyme_conc=0.0025, 
-            km=0.05
-        )                    
-        self.isomerase = Enzyme(
-            name="Glukose-6-phosphat-Isomerase",
-            kcat=150, 
-            enzyme_conc=0.002,
-            km=0.1
-        )      
-        self.pfk = Enzyme(
-            name="Phosphofructokinase",
-            kcat=300, 
-            enzyme_conc=0.002, 
-            km=0.08
-        )                    
-        self.aldolase = Enzyme(
-            name="Aldolase", 
-            kcat=100, 
-            enzyme_conc=0.0015, 
-            km=0.03
-        )                         
-        self.triosephosphat_isomerase = Enzyme(
-            name="Triosephosphatisomerase", 
-            kcat=4300, 
-            enzyme_conc=0.002,
-            km=0.6
-        )               
-        self.gapdh = Enzyme(
-            name="Glycerinaldehyd-3-phosphat-Dehydrogenase",
-            kcat=250, 
-            enzyme_conc=0.002,
-            km=0.02
-        )                                
-        self.pgk = Enzyme(
-            name="3-Phosphoglyceratkinase",
-            kcat=300, 
-            enzyme_conc=0.002,
-            km=0.2
-        )                                   
-        self.pgm = Enzyme(
-            name="Phosphoglyceratmutase",
-            kcat=100,
-            enzyme_conc=0.002, 
-            km=0.15
-        )                                    
-        self.enolase = Enzyme(
-            name="Enolase",
-            kcat=200, 
-            enzyme_conc=0.002, 
-            km=0.07)                            
-        self.pyruvate_kinase = Enzyme(
-            name="Pyruvat-Kinase", 
-            kcat=350, 
-            enzyme_conc=0.002, 
-            km=0.07
-        )             
-        
-        self.reactions = [                                                                # Reaktionen definieren Ablauf aus Literatur; Umsetzung Substrat zu Produkt durch Enzym
-            Reaction(
-                name="Glukose → Glukose-6-phosphat",
-                substrate=self.glucose, 
-                product=self.g6p, 
-                enzyme=self.hexokinase
-            ),
-            Reaction(
-                name="Glukose-6-phosphat → Fruktose-6-phosphat", 
-                substrate=self.g6p,
-                product=self.f6p, 
-                enzyme=self.isomerase
-            ),
-            Reaction(
-                name="Fruktose-6-phosphat → Fruktose-1,6-bisphosphat", 
-                substrate=self.f6p, 
-                product=self.f1_6bp,
-                enzyme=self.pfk
-            ),
-            SplitReaction(
-                name="Fruktose-1,6-bisphosphat → Dihydroxyacetonphosphat + Glycerinaldehyd-3-phosphat", 
-                substrate=self.f1_6bp,
-                product1=self.dhap,
-                product2=self.g3p, 
-                enzyme=self.aldolase
-            ),
-            Reaction(
-                name="Dihydroxyacetonphosphat → Glycerinaldehyd-3-phosphat", 
-                substrate=self.dhap, 
-                product=self.g3p,
-                enzyme=self.triosephosphat_isomerase
-            ),
-            Reaction(
-                name="Glycerinaldehyd-3-phosphat → 1,3-Bisphosphoglycerat", 
-                substrate=self.g3p,
-                product=self.bpg_1_3, 
-                enzyme=self.gapdh
-            ),
-            Reaction(
-                name="1,3-Bisphosphoglycerat → 3-Phosphoglycerat", 
-                substrate=self.bpg_1_3, 
-                product=self.pg_3, 
-                enzyme=self.pgk
-            ),
-            Reaction(
-                name="3-Phosphoglycerat → 2-Phosphoglycerat", 
-                substrate=self.pg_3, 
-                product=self.pg_2, 
-                enzyme=self.pgm
-            ),
-            Reaction(
-                name="2-Phosphoglycerat → Phosphoenolpyruvat", 
-                substrate=self.pg_2, 
-                product=self.pep,
-                enzyme=self.enolase
-            ),
-            Reaction(
-                name="Phosphoenolpyruvat → Pyruvat",
-                substrate=self.pep, 
-                product=self.pyruvate, 
-                enzyme=self.pyruvate_kinase
-            ),
-        ]
+    def __init__(self, glucose_conc=None, record_history=True, spec=None):             # Anfangskonzentration von Glukose (None → initial_conc aus der Beschreibung, Standard 10mMol/L); kann in Streamlit angepasst werden oder beim Erstellen eines Objekts der Klasse; spec → anderer Stoffwechselweg (Standard: GLYCOLYSIS_SPEC)
+        spec = GLYCOLYSIS_SPEC if spec is None else spec
+        self._check_ids([entry["id"] for entry in spec["metabolites"]] + [entry["id"] for entry in spec["enzymes"]])
+        metabolites = {}
+        for entry in spec["metabolites"]:                                             # Metabolite anlegen, Glukose startet mit glucose_conc (falls angegeben)
+            conc = glucose_conc if entry["id"] == "glucose" and glucose_conc is not None else entry.get("initial_conc", 0.0)
+            metabolites[entry["id"]] = Metabolite(name=entry["name"], initial_conc=conc, record_history=record_history)
+        enzymes = {
+            entry["id"]: Enzyme(name=entry["name"], kcat=entry["kcat"], enzyme_conc=entry["enzyme_conc"], km=entry.get("km", 1.0))
+            for entry in spec["enzymes"]
+        }
+
+        reactions = []
+        for entry in spec["reactions"]:
+            missing = [i for i in [entry["substrate"], *entry["products"]] if i not in metabolites] + \
+                      [entry["enzyme"]] * (entry["enzyme"] not in enzymes)
+            if missing:
+                raise ValueError(f"Unbekannte ids in Reaktion {entry}: {missing}")
+            substrate = metabolites[entry["substrate"]]
+            products = [metabolites[i] for i in entry["products"]]
+            name = entry.get("name") or f"{substrate.name} → {' + '.join(p.name for p in products)}"
+            if len(products) == 1:
+                reaction = Reaction(name=name, substrate=substrate, product=products[0], enzyme=enzymes[entry["enzyme"]])
+            elif len(products) == 2:                                                      # Spaltung eines Substrats in 2 Produkte
+                reaction = SplitReaction(name=name, substrate=substrate, product1=products[0], product2=products[1], enzyme=enzymes[entry["enzyme"]])
+            else:
+                raise ValueError(f"Reaktion {name} hat {len(products)} Produkte (erlaubt: 1 oder 2)")
+            reactions.append(reaction)
+        self._setup(spec, metabolites, enzymes, reactions)
+
+
+    @classmethod
+    def _check_ids(cls, ids):                                                             # ids werden Attribute des Modells (model.glucose) → dürfen weder Methoden noch andere ids überdecken
+        seen = set()
+        for key in ids:
+            if not isinstance(key, str) or not key.isidentifier() or keyword.iskeyword(key):
+                raise ValueError(f"Ungültige id {key!r}: muss ein Python-Bezeichner sein (z.B. 'glucose', 'hexokinase')")
+            if key in seen:
+                raise ValueError(f"id {key!r} ist mehrfach vergeben (Metabolite und Enzyme brauchen eindeutige ids)")
+            if hasattr(cls, key) or key in cls._ATTRIBUTES:
+                raise ValueError(f"id {key!r} ist als Attribut von GlycolysisPathway reserviert")
+            seen.add(key)
+
+
+    def _setup(self, spec, metabolites, enzymes, reactions, source=None):                 # gemeinsame Attribute für __init__ und clone (neue Attribute nur hier ergänzen → Kopien sind vollständig)
+        for key, obj in {**metabolites, **enzymes}.items():                               # Zugriff wie bisher über Attribute, z.B. model.glucose, model.hexokinase
+            setattr(self, key, obj)
+        self.spec = spec
+        self.reactions = reactions
+        self.metabolites = list(metabolites.values())                                     # feste Reihenfolge der Metabolite → Spaltenreihenfolge für die kompilierte Simulation
+        self._metabolite_ids = list(metabolites)
+        self.enzymes = [reaction.enzyme for reaction in reactions]                        # Enzyme in Reaktionsreihenfolge
+        self.instrumentation = None                                                       # optionale Messung pro Reaktion (enable_instrumentation)
+        if source is not None:                                                            # Kopie: unveränderliche Beschreibung und Struktur werden geteilt
+            self._clone_layout, self._compiled = source._clone_layout, source._compiled
+            self.carbons, self.atp, self.nadh = source.carbons, source.atp, source.nadh
+            return
+        self._clone_layout = None                                                         # wird beim ersten clone() berechnet
+        self._compiled = None                                                             # kompilierte Form, wird beim ersten compile() berechnet
+        carbons = [entry.get("carbons") for entry in self.spec["metabolites"]]
+        self.carbons = None if None in carbons else np.array(carbons, dtype=np.float64)    # C-Atome pro Metabolit (None, wenn nicht in der Beschreibung)
+        self.atp = np.array([entry.get("atp", 0) for entry in self.spec["reactions"]], dtype=np.float64)
+        self.nadh = np.array([entry.get("nadh", 0) for entry in self.spec["reactions"]], dtype=np.float64)
+
+
+    def enable_instrumentation(self):                                                     # schaltet Zähler und Zeitmessung pro Reaktion ein (nur engine="objects")
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(self.reactions)
+        return self.instrumentation
+
+
+    def disable_instrumentation(self):                                                    # ausgeschaltet läuft simulate wieder ohne jeden Zusatzaufwand
+        self.instrumentation = None
+
+
+    def compile(self):                                                                    # Übersetzt den aktuellen Objektgraphen in Index- und Parameterarrays
+        vmax, km = [e.vmax for e in self.enzymes], [e.km for e in self.enzymes]
+        if self._compiled is None:                                                        # Indizes und Stöchiometrie nur einmal (von Kopien mitbenutzt)
+            self._compiled = CompiledPathway(self.metabolites, self.reactions)
+        elif self._compiled.vmax.tolist() != vmax or self._compiled.km.tolist() != km:    # Parameter geändert (z.B. set_parameters, enzyme.kcat = ...) → nur vmax/Km neu
+            self._compiled = self._compiled.with_parameters(vmax, km)
+        return self._compiled
+
+
+    def state(self):                                                                      # aktuelle Konzentrationen aller Metabolite als Array
+        return np.array([m.conc for m in self.metabolites], dtype=np.float64)
+
+
+    def set_state(self, conc):                                                            # schreibt Konzentrationen (z.B. Endzustand der Array-Simulation) zurück in die Metabolite
+        for metabolite, value in zip(self.metabolites, conc):
+            metabolite.conc = float(value)
+
+
+    def parameters(self):                                                                 # Enzymparameter als Array (n_enzyme, 3) mit Spalten kcat, enzyme_conc, km (Reaktionsreihenfolge)
+        return np.array([[e.kcat, e.enzyme_conc, e.km] for e in self.enzymes], dtype=np.float64)
+
+
+    def set_parameters(self, params):                                                     # Gegenstück zu parameters(): setzt kcat, [E] und Km aller Enzyme (vmax wird in Enzyme neu berechnet)
+        for enzyme, (kcat, enzyme_conc, km) in zip(self.enzymes, np.asarray(params, dtype=np.float64).tolist()):
+            enzyme.enzyme_conc = enzyme_conc
+            enzyme.kcat = kcat
+            enzyme.km = km
+
+
+    def _layout(self):                                                                    # Struktur des Objektgraphen als Indizes (einmal berechnet, von Kopien mitbenutzt)
+        if self._clone_layout is None:
+            enzyme_ids = [entry["id"] for entry in self.spec["enzymes"]]                 # jedes Enzym genau einmal, auch wenn es mehrere Reaktionen katalysiert
+            met_index = {id(m): i for i, m in enumerate(self.metabolites)}
+            enz_index = {id(getattr(self, key)): i for i, key in enumerate(enzyme_ids)}
+            reactions = [(type(r), r.name, met_index[id(r.substrate)], [met_index[id(p)] for p in r.products], enz_index[id(r.enzyme)])
+                         for r in self.reactions]
+            self._clone_layout = (enzyme_ids, reactions)
+        return self._clone_layout
+
+
+    def clone(self, record_history=None):                                                 # Kopie mit aktuellem Zustand und aktuellen Parametern, ohne die Beschreibung erneut auszuwerten (Verlauf beginnt neu)
+        if record_history is None:
+            record_history = self.metabolites[0].record_history if self.metabolites else True
+        enzyme_ids, reactions = self._layout()
+        mets = [Metabolite(m.name, m.conc, record_history) for m in self.metabolites]
+        enzymes = [Enzyme(e.name, e.kcat, e.enzyme_conc, e.km) for e in map(self.__dict__.__getitem__, enzyme_ids)]
+        new = object.__new__(type(self))
+        new._setup(self.spec, dict(zip(self._metabolite_ids, mets)), dict(zip(enzyme_ids, enzymes)),
+                   [cls(name, mets[sub], *[mets[p] for p in prods], enzymes[enz]) for cls, name, sub, prods, enz in reactions], source=self)
+        return new
+
+
+    def with_params(self, params, glucose=None, record_history=None):                     # Variante mit anderen Enzymparametern (n_enzyme, 3) und optional anderer Glukosekonzentration, z.B. pro Punkt einer Parameterstudie
+        new = self.clone(record_history)
+        new.set_parameters(params)
+        if glucose is not None:
+            if not hasattr(new, "glucose"):
+                raise ValueError("glucose kann nur für Stoffwechselwege mit dem Metaboliten 'glucose' gesetzt werden")
+            new.glucose.conc = float(glucose)
+            new.glucose.history = [new.glucose.conc]
+        return new
+
+
+    def checkpoint(self, step=0, dt=0.1, stride=1, rows=None):                           # Momentaufnahme des aktuellen Zustands und der Parameter (step = bisher gerechnete Schritte)
+        return Checkpoint([m.name for m in self.metabolites], self.state(), self.parameters(), step, rows, dt, stride)
+
+
+    def restore(self, checkpoint):                                                        # setzt Zustand und Parameter aus einer Momentaufnahme (Checkpoint oder Dateipfad)
+        if not isinstance(checkpoint, Checkpoint):
+            checkpoint = Checkpoint.load(checkpoint)
+        if checkpoint.names != [m.name for m in self.metabolites] or checkpoint.parameters.shape != (len(self.enzymes), 3):
+            raise ValueError("Momentaufnahme passt nicht zu diesem Stoffwechselweg")
+        self.set_state(checkpoint.state)
+        self.set_parameters(checkpoint.parameters)
+        for m in self.metabolites:
+            m.history = [m.conc]                                                          # Verlauf beginnt beim wiederhergestellten Zustand
+        return checkpoint
+
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, record_history=True, spec=None):                # neues Modell im Zustand der Momentaufnahme, z.B. ein eingeschwungener Zustand als Start vieler Experimente
+        model = cls(record_history=record_history, spec=spec)
+        model.restore(checkpoint)
+        return model
+
+
+    def simulate_batch(self, params=None, glucose=None, steps=100, dt=0.1, stride=1, backend="auto", accounting=False):
+        # Simuliert viele Parametersätze gleichzeitig → Ergebnis (batch, Zeilen, Metabolite)
+        # accounting=True → (Ergebnis, flux) mit der umgesetzten Stoffmenge pro Lauf und Reaktion (batch, Reaktionen)
+        if stride < 1:
+            raise ValueError("stride muss >= 1 sein")
+        params = self.parameters() if params is None else np.asarray(params, dtype=np.float64)
+        if params.shape[-2:] != (len(self.enzymes), 3):
+            raise ValueError(f"params muss die Form (batch, {len(self.enzymes)}, 3) haben (kcat, enzyme_conc, km)")
+        if glucose is not None and not hasattr(self, "glucose"):
+            raise ValueError("glucose kann nur für Stoffwechselwege mit dem Metaboliten 'glucose' gesetzt werden")
+        glucose = None if glucose is None else np.asarray(glucose, dtype=np.float64)
+        batch = np.broadcast_shapes(params.shape[:-2], () if glucose is None else glucose.shape)   # Parametersätze und Glukosewerte werden gegeneinander gebroadcastet
+        if len(batch) > 1:
+            raise ValueError("params und glucose dürfen nur eine Batch-Dimension haben")
+        n = batch[0] if batch else 1
+
+        params = np.broadcast_to(params, (n,) + params.shape[-2:])
+        conc = np.tile(self.state(), (n, 1))                                             # Metabolite starten beim aktuellen Zustand des Modells
+        if glucose is not None:
+            conc[:, self.metabolites.index(self.glucose)] = np.broadcast_to(glucose, (n,))
+        vmax = params[:, :, 0] * params[:, :, 1]                                         # vmax = kcat * enzyme_conc wie in Enzyme
+        flux = np.zeros((n, len(self.reactions))) if accounting else None
+        result = self.compile().run_batch(conc, vmax, params[:, :, 2], steps, dt, stride, backend, flux)   # Zustand des Modells bleibt unverändert
+        return (result, flux) if accounting else result
 
     
-    def simulate(self, steps=100, dt=0.1):                                                                # Speichert Verlauf der Metabolitkonzentrationen über Anzahl von Zeitschritten (100 Zeitschritte mit je dt Sekunden → Anpassung über streamlit) 
-        history = {
-            "Glukose": [],
-            "Glukose-6-phosphat": [],
-            "Fruktose-6-phosphat": [],
-            "Fruktose-1,6-bisphosphat": [],
-            "Dihydroxyacetonphosphat": [],
-            "Glycerinaldehyd-3-phosphat": [],
-            "1,3-Bisphosphoglycerat": [],
-            "3-Phosphoglycerat": [],
-            "2-Phosphoglycerat": [],
-            "Phosphoenolpyruvat": [],
-            "Pyruvat": [],
-        }
-                                                                                                    # Anfangswerte speichern --> sodass Streamlit bei angegebener Konzentration beginnt und nicht bereits das erste Mal die Schleife durchläuft
-        history["Glukose"].append(self.glucose.conc)
-        history["Glukose-6-phosphat"].append(self.g6p.conc)
-        history["Fruktose-6-phosphat"].append(self.f6p.conc)
-        history["Fruktose-1,6-bisphosphat"].append(self.f1_6bp.conc)
-        history["Dihydroxyacetonphosphat"].append(self.dhap.conc)
-        history["Glycerinaldehyd-3-phosphat"].append(self.g3p.conc)
-        history["1,3-Bisphosphoglycerat"].append(self.bpg_1_3.conc)
-        history["3-Phosphoglycerat"].append(self.pg_3.conc)
-        history["2-Phosphoglycerat"].append(self.pg_2.conc)
-        history["Phosphoenolpyruvat"].append(self.pep.conc)
-        history["Pyruvat"].append(self.pyruvate.conc)
-
-        for _ in range(steps):                                                                            # Durchlaufen der Schleife steps-mal
-            for reaction in self.reactions:                                                               # Aufrufen der Methode step(dt) für jede Reaktion
-                reaction.step(dt)                                                                        
-                
-            history["Glukose"].append(self.glucose.conc)                                                  # neue Konzentration der Metabolite wird in einer Liste gespeichert welche im history-Dictionary unter dem jeweiligen Namen gespeichert wird                                                  
-            history["Glukose-6-phosphat"].append(self.g6p.conc)
-            history["Fruktose-6-phosphat"].append(self.f6p.conc)
-            history["Fruktose-1,6-bisphosphat"].append(self.f1_6bp.conc)
-            history["Dihydroxyacetonphosphat"].append(self.dhap.conc)
-            history["Glycerinaldehyd-3-phosphat"].append(self.g3p.conc)
-            history["1,3-Bisphosphoglycerat"].append(self.bpg_1_3.conc)
-            history["3-Phosphoglycerat"].append(self.pg_3.conc)
-            history["2-Phosphoglycerat"].append(self.pg_2.conc)
-            history["Phosphoenolpyruvat"].append(self.pep.conc)
-            history["Pyruvat"].append(self.pyruvate.conc)
-        
-        return history                                                                                     #Rückgabe des Dictionarys mit den Konzentrationsverläufen über die Zeit                                                             
+    def simulate(self, steps=100, dt=0.1, engine="objects", stride=1,
+                 method="euler", t_eval=None, rtol=1e-6, atol=1e-9, backend="auto",
+                 accounting=False, record=True):                                      # Speichert Verlauf der Metabolitkonzentrationen über Anzahl von Zeitschritten (100 Zeitschritte mit je dt Sekunden → Anpassung über streamlit); stride=k → nur jeder k-te Schritt wird gespeichert
+        if self.instrumentation is not None and (engine != "objects" or method.lower() != "euler"):      # vor allen anderen Varianten prüfen → Zähler bleiben nie unbemerkt bei 0
+            raise ValueError("Die Instrumentierung misst nur engine='objects' mit method='euler' (vorher disable_instrumentation aufrufen)")
+        if method.lower() != "euler":                                                                     # adaptive ODE-Löser (z.B. "bdf"/"radau" für steife Systeme) statt festem Euler-Schritt
+            ignored = [name for name, given in (("accounting=True", accounting), ("record=False", not record),
+                                                (f"engine={engine!r}", engine != "objects"), (f"backend={backend!r}", backend != "auto")) if given]
+            if ignored:                                                                                   # gelten nur für das Euler-Verfahren → nicht stillschweigend übergehen
+                raise ValueError(f"Nur mit method='euler' möglich: {', '.join(ignored)}")
+            return self._simulate_ode(steps, dt, stride, method, t_eval, rtol, atol)
+        if engine not in ("objects", "array"):
+            raise ValueError(f"Unbekannte engine: {engine!r} (erlaubt: 'objects', 'array')")
+        if stride < 1:
+            raise ValueError("stride muss >= 1 sein")
+        if not record:                                                                                    # record=False → nur Anfangszeile und Endzustand (z.B. zusammen mit accounting=True)
+            stride = steps + 1
+
+        initial = self.state()
+        flux = np.zeros(len(self.reactions)) if accounting else None                                      # laufende Summe der Umsätze pro Reaktion
+        trajectory = Trajectory.empty([m.name for m in self.metabolites], steps, dt, stride)             # ein zusammenhängendes (Zeilen, Metabolite)-Array statt 11 Listen
+        if engine == "array":                                                                             # kompilierte Simulation auf Arrays statt Objekten (gleiche Reihenfolge der Reaktionen)
+            trajectory.final = self.compile().run(initial, steps, dt, out=trajectory.data, stride=stride, backend=backend, flux=flux)   # backend: "numba" (übersetzt) oder "numpy" (reines Python/NumPy)
+            self.set_state(trajectory.final)                                                              # Endzustand zurückschreiben, damit weitere simulate-Aufrufe fortsetzen (Metabolite.history wird hier nicht geführt)
+            if accounting:
+                trajectory.accounting = self.accounting(flux, initial, trajectory.final)
+            return trajectory
+
+        data = trajectory.data
+        data[0] = [m.conc for m in self.metabolites]                                                      # Anfangswerte speichern --> sodass Streamlit bei angegebener Konzentration beginnt und nicht bereits das erste Mal die Schleife durchläuft
+        row = 1
+        if self.instrumentation is None:                                                                  # Variante einmal vor der Schleife wählen statt bei jedem Schritt
+            stepper = [reaction.step for reaction in self.reactions]
+        else:                                                                                             # gemessene Variante
+            stepper = [functools.partial(self.instrumentation.step, j, reaction) for j, reaction in enumerate(self.reactions)]
+        recording = [m.record_history for m in self.metabolites]
+        if not record:                                                                                    # record=False → für diesen Lauf auch kein Metabolite.history (O(1) Speicher)
+            for m in self.metabolites:
+                m.record_history = False
+        try:
+            if flux is None:
+                for i in range(1, steps + 1):                                                             # Durchlaufen der Schleife steps-mal
+                    for step in stepper:                                                                  # Aufrufen der Methode step(dt) für jede Reaktion
+                        step(dt)
+                    if i % stride == 0:                                                                   # neue Konzentrationen der Metabolite werden als Zeile der Trajectory gespeichert
+                        data[row] = [m.conc for m in self.metabolites]
+                        row += 1
+            else:                                                                                         # mit Flussbilanz
+                for i in range(1, steps + 1):
+                    for j, step in enumerate(stepper):
+                        flux[j] += step(dt)
+                    if i % stride == 0:
+                        data[row] = [m.conc for m in self.metabolites]
+                        row += 1
+        finally:
+            for m, flag in zip(self.metabolites, recording):
+                m.record_history = flag
+        trajectory.final = self.state()
+        if accounting:
+            trajectory.accounting = self.accounting(flux, initial, trajectory.final)
+        return trajectory                                                                                  # Rückgabe der Trajectory mit den Konzentrationsverläufen über die Zeit (Zugriff wie Dictionary: trajectory["Pyruvat"])
+
+
+    def accounting(self, flux, initial, final):                                                           # Bilanz eines Laufs aus den aufsummierten Umsätzen und Anfangs-/Endzustand (O(1) Speicher)
+        return FluxAccounting([r.name for r in self.reactions], flux, self.carbons, initial, final, self.atp, self.nadh)
+
+
+    def iter_simulate(self, steps=100, dt=0.1, chunk_size=10_000, engine="array", stride=1, backend="auto", accounting=False,
+                      start=0, checkpoint=None, checkpoint_steps=None, checkpoint_seconds=None):
+        # Generator: liefert die Simulation in Teilstücken zu je chunk_size Schritten als Trajectory (chunk.final = aktueller Zustand);
+        # das erste Teilstück beginnt mit den Anfangswerten, alle Teilstücke hintereinander ergeben dasselbe Array wie simulate
+        # start > 0: das Modell steht bereits bei Schritt start (z.B. nach restore) → es wird bis Schritt steps weitergerechnet, ohne die Anfangszeile erneut zu liefern
+        # checkpoint=pfad: alle checkpoint_steps Schritte und/oder checkpoint_seconds Sekunden eine Momentaufnahme schreiben,
+        # jeweils erst nachdem der Aufrufer das vorherige Teilstück verarbeitet hat (z.B. mit TrajectoryWriter gespeichert)
+        if chunk_size < 1 or chunk_size % stride:
+            raise ValueError("chunk_size muss ein positives Vielfaches von stride sein")
+        if checkpoint_steps is not None and (checkpoint_steps < 1 or checkpoint_steps % stride):
+            raise ValueError("checkpoint_steps muss ein positives Vielfaches von stride sein")
+        if start:
+            if start >= steps:                                                                            # Lauf war bereits abgeschlossen
+                return
+            if start % stride:
+                raise ValueError("start muss ein Vielfaches von stride sein")
+        done = start
+        last_step, last_time = start, time.perf_counter()
+        while True:
+            n = min(chunk_size, steps - done)
+            if checkpoint is not None and checkpoint_steps is not None:
+                n = min(n, last_step + checkpoint_steps - done)                                           # Teilstück endet genau am nächsten Sicherungsschritt
+            chunk = self.simulate(n, dt, engine=engine, stride=stride, backend=backend, accounting=accounting)   # Modellzustand wird fortgeschrieben → nächstes Teilstück setzt hier an
+            if done:                                                                                      # Anfangszeile ist die letzte Zeile des vorherigen Teilstücks
+                final, balance = chunk.final, chunk.accounting
+                chunk = Trajectory(chunk.names, chunk.data[1:], dt, stride, start=done + stride)
+                chunk.final, chunk.accounting = final, balance
+            yield chunk
+            done += n
+            if checkpoint is not None and (
+                    (checkpoint_steps is not None and done - last_step >= checkpoint_steps) or
+                    (checkpoint_seconds is not None and time.perf_counter() - last_time >= checkpoint_seconds) or
+                    done >= steps):                                                                       # am Ende immer sichern → abgeschlossener Lauf wird nicht wiederholt
+                self.checkpoint(done, dt, stride).save(checkpoint)
+                last_step, last_time = done, time.perf_counter()
+            if done >= steps:
+                return
+
+
+    def _simulate_ode(self, steps, dt, stride, method, t_eval, rtol, atol):
+        try:
+            from scipy.integrate import solve_ivp                                                         # optionale Abhängigkeit, nur für die adaptiven Löser nötig
+        except ImportError as exc:
+            raise ImportError(f"method={method!r} benötigt scipy (pip install scipy)") from exc
+        if method.lower() not in _ODE_METHODS:
+            raise ValueError(f"Unbekannte method: {method!r} (erlaubt: 'euler', {', '.join(map(repr, _ODE_METHODS))})")
+        if stride < 1:
+            raise ValueError("stride muss >= 1 sein")
+
+        if t_eval is None:                                                                                # Standard: dieselben Zeitpunkte wie die Euler-Simulation mit steps, dt und stride
+            t_eval = np.arange(steps // stride + 1) * (stride * dt)
+        t_eval = np.asarray(t_eval, dtype=np.float64)
+        if t_eval.ndim != 1 or len(t_eval) == 0:
+            raise ValueError("t_eval muss mindestens einen Zeitpunkt enthalten")
+        names = [m.name for m in self.metabolites]
+        if t_eval[-1] == 0:                                                                               # kein Zeitintervall (z.B. steps=0) → nur der Anfangszustand, wie bei der Euler-Simulation
+            trajectory = Trajectory(names, np.tile(self.state(), (len(t_eval), 1)), dt, stride, time=t_eval)
+            trajectory.solver_stats = {"nfev": 0, "njev": 0, "nlu": 0}
+            return trajectory
+        compiled = self.compile()
+        options = {}
+        if method.lower() in ("radau", "bdf", "lsoda"):
+            options["jac"] = lambda t, conc: compiled.jacobian(conc)                                      # analytische Jacobi-Matrix für die impliziten Verfahren
+        solution = solve_ivp(
+            lambda t, conc: compiled.derivative(conc),
+            (0.0, float(t_eval[-1])),
+            self.state(),
+            method=_ODE_METHODS[method.lower()],
+            t_eval=t_eval,                                                                                # Ausgabe auf dem gewünschten Zeitgitter (dense output des Lösers)
+            rtol=rtol,
+            atol=atol,
+            **options,
+        )
+        if not solution.success:
+            raise RuntimeError(f"ODE-Löser fehlgeschlagen: {solution.message}")
+
+        data = np.maximum(solution.y.T, 0.0)                                                              # wie max(conc, 0): kleine negative Werte des Lösers abschneiden
+        trajectory = Trajectory(names, data, dt, stride, time=t_eval)
+        trajectory.solver_stats = {key: int(getattr(solution, key)) for key in ("nfev", "njev", "nlu")}   # Anzahl Auswertungen der Geschwindigkeiten / Jacobi-Matrix / LU-Zerlegungen
+        self.set_state(trajectory.final)
+        return trajectory
+
+
+    def steady_state(self, mode="integrate", tol=1e-6, dt=0.1, max_steps=10_000_000, check_every=100, backend="auto"):
+        # Endzustand ohne vollständige Trajektorie: "integrate" → Euler-Schritte bis ||S · v|| <= tol, d.h. dx/dt ≈ 0 (Prüfung alle check_every Schritte),
+        # "root" → direkte Lösung von S · v(x) = 0 unter Erhaltung der Erhaltungsgrößen (z.B. Kohlenstoff). Das Modell selbst bleibt unverändert.
+        compiled = self.compile()
+        conc = self.state()
+        if mode == "integrate":
+            steps = 0
+            norm = np.linalg.norm(compiled.derivative(conc))                             # nicht ||v||: in Zyklen (z.B. A ⇄ B) fließt im Gleichgewicht weiter Stoff, S · v ist aber 0
+            while norm > tol and steps < max_steps:
+                n = min(check_every, max_steps - steps)
+                previous = conc
+                conc = compiled.run(conc, n, dt, out=np.empty((2, len(conc))), stride=n, backend=backend)   # nur Endzustand des Blocks wird benötigt
+                steps += n
+                norm = np.linalg.norm(compiled.derivative(conc))
+                if norm > tol and np.linalg.norm(conc - previous) <= tol * n * dt:          # Euler-Verfahren steht still, ||S · v|| bleibt aber > tol (Diskretisierungsfehler von dt, z.B. bei Zyklen)
+                    break                                                                 # → nicht konvergiert; kleineres dt oder mode="root"
+            return SteadyState(compiled.names, conc, norm <= tol, norm, steps, steps * dt, mode, np.linalg.norm(compiled.rates(conc)))
+
+        if mode == "root":
+            try:
+                from scipy.optimize import least_squares                                  # optionale Abhängigkeit wie bei den adaptiven ODE-Lösern
+            except ImportError as exc:
+                raise ImportError("mode='root' benötigt scipy (pip install scipy)") from exc
+            laws = compiled.conservation_laws()
+            totals = laws @ conc                                                          # Erhaltungsgrößen des Anfangszustands legen den Gleichgewichtszustand fest
+            solution = least_squares(
+                lambda x: np.concatenate([compiled.derivative(x), laws @ x - totals]),
+                conc,
+                jac=lambda x: np.vstack([compiled.jacobian(x), laws]),
+                bounds=(0.0, np.inf),                                                     # Konzentrationen bleiben >= 0
+                xtol=1e-15, ftol=1e-15, gtol=1e-15,
+            )
+            norm = np.linalg.norm(compiled.derivative(solution.x))
+            return SteadyState(compiled.names, solution.x, norm <= tol, norm, solution.nfev, None, mode, np.linalg.norm(compiled.rates(solution.x)))
+
+        raise ValueError(f"Unbekannter mode: {mode!r} (erlaubt: 'integrate', 'root')")
+
+
+# Ergebnis von steady_state: Konzentrationen, Konvergenz und Zeitpunkt/Iteration, an dem das Kriterium erfüllt war
+
+
+class SteadyState:
+
+
+    def __init__(self, names, conc, converged, derivative_norm, iterations, time, mode, rate_norm=None):
+        self.names = list(names)
+        self.conc = conc                                                                # Konzentrationen im (Fließ-)Gleichgewicht bzw. am Ende
+        self.converged = bool(converged)                                                # ||S · v|| <= tol erreicht
+        self.derivative_norm = float(derivative_norm)                                   # Norm von dx/dt = S · v im Endzustand (Kriterium für converged)
+        self.rate_norm = None if rate_norm is None else float(rate_norm)                # Norm des Geschwindigkeitsvektors v (≠ 0 bei Zyklen im Fließgleichgewicht)
+        self.iterations = iterations                                                    # Euler-Schritte ("integrate") bzw. Funktionsauswertungen ("root")
+        self.time = time                                                                # simulierte Zeit in s ("integrate"), None bei "root"
+        self.mode = mode
+
+
+    def __getitem__(self, name):
+        return self.conc[self.names.index(name)]
+
+
+    def __repr__(self):
+        status = "konvergiert" if self.converged else "nicht konvergiert"
+        return f"SteadyState({self.mode}, {status}, |S·v|={self.derivative_norm:.3g}, iterations={self.iterations})"
+
+
+# Momentaufnahme eines laufenden Modells (Zustand, Parameter, Schrittzähler, Zeilen der Trajektorie) → Fortsetzen nach Abbruch oder Verzweigen in viele Läufe
+# Binärformat: fester Kopf (_CHECKPOINT_HEADER), danach Zustand und Parameter als float64 und die Metabolitnamen als JSON → Werte werden bitgenau gespeichert
+
+
+_CHECKPOINT_MAGIC = b"GLYKCKPT"
+_CHECKPOINT_HEADER = struct.Struct("<8sHIIQQQdI")                                        # Kennung, Version, Metabolite, Enzyme, Schritt, Zeilen, stride, dt, Länge der Namen
+
+
+class Checkpoint:
+
+    VERSION = 1
+
+
+    def __init__(self, names, state, parameters, step=0, rows=None, dt=0.1, stride=1):
+        self.names = list(names)
+        self.state = np.array(state, dtype=np.float64)                                  # Konzentrationen nach step Schritten
+        self.parameters = np.array(parameters, dtype=np.float64).reshape(-1, 3)         # (n_enzyme, 3) mit kcat, enzyme_conc, km wie parameters()
+        self.step = int(step)                                                           # Anzahl bereits gerechneter Euler-Schritte
+        self.rows = step // stride + 1 if rows is None else int(rows)                   # Zeilen der bisher gespeicherten Trajektorie (Anfangszeile + jeder stride-te Schritt)
+        self.dt = float(dt)
+        self.stride = int(stride)
+
+
+    def to_bytes(self):
+        import json
+        names = json.dumps(self.names, ensure_ascii=False).encode("utf-8")
+        header = _CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, self.VERSION, len(self.state), len(self.parameters),
+                                         self.step, self.rows, self.stride, self.dt, len(names))
+        return header + self.state.astype("<f8").tobytes() + self.parameters.astype("<f8").tobytes() + names
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        import json
+        magic, version, n_met, n_enz, step, rows, stride, dt, n_names = _CHECKPOINT_HEADER.unpack_from(data)
+        if magic != _CHECKPOINT_MAGIC:
+            raise ValueError("keine Glykolyse-Momentaufnahme")
+        if version != cls.VERSION:
+            raise ValueError(f"Momentaufnahme hat Version {version}, unterstützt wird {cls.VERSION}")
+        offset = _CHECKPOINT_HEADER.size
+        state = np.frombuffer(data, "<f8", n_met, offset)
+        offset += 8 * n_met
+        parameters = np.frombuffer(data, "<f8", 3 * n_enz, offset).reshape(n_enz, 3)
+        offset += 24 * n_enz
+        names = json.loads(bytes(data[offset:offset + n_names]).decode("utf-8"))
+        return cls(names, state, parameters, step, rows, dt, stride)
+
+
+    def save(self, path):                                                               # erst in eine temporäre Datei schreiben → bei Abbruch bleibt die vorherige Momentaufnahme gültig
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+    def __repr__(self):
+        return f"Checkpoint(step={self.step}, rows={self.rows}, dt={self.dt}, stride={self.stride}, {len(self.names)} Metabolite)"
+
+
+# Bilanz eines Laufs: integrierter Fluss pro Reaktion, Kohlenstoffbilanz (Spaltung 1 C6 → 2 C3 über carbons) sowie ATP-/NADH-Ausbeute
+
+
+class FluxAccounting:
+
+
+    def __init__(self, names, flux, carbons, initial, final, atp, nadh):
+        self.flux = dict(zip(names, np.asarray(flux).tolist()))                         # umgesetzte Stoffmenge pro Reaktion (mM)
+        self.carbon_initial = None if carbons is None else float(carbons @ initial)     # C-Atome gesamt (mM C) am Anfang und Ende
+        self.carbon_final = None if carbons is None else float(carbons @ final)
+        self.atp = float(atp @ flux)                                                    # Netto-ATP (mM), z.B. 2 pro Glukose bei vollständigem Umsatz
+        self.nadh = float(nadh @ flux)
+
+
+    @property
+    def carbon_error(self):                                                             # Abweichung der Kohlenstoffbilanz (sollte ~0 sein)
+        if self.carbon_initial is None:
+            return None
+        return self.carbon_final - self.carbon_initial
+
+
+    def add(self, other):                                                               # Bilanzen aufeinanderfolgender Teilstücke (iter_simulate) zusammenfassen
+        for name, value in other.flux.items():
+            self.flux[name] += value
+        self.carbon_final = other.carbon_final
+        self.atp += other.atp
+        self.nadh += other.nadh
+        return self
+
+
+    def as_dict(self):
+        return {"flux": dict(self.flux), "carbon_initial": self.carbon_initial, "carbon_final": self.carbon_final,
+                "carbon_error": self.carbon_error, "atp": self.atp, "nadh": self.nadh}
+
+
+    def __repr__(self):
+        return f"FluxAccounting(ATP={self.atp:.3f} mM, NADH={self.nadh:.3f} mM, C-Fehler={self.carbon_error})"
+
+
+# Messung pro Reaktion: Aufrufe, Zeit in rate/step, wie oft die Begrenzungen greifen und umgesetzte Stoffmenge
+
+
+class Instrumentation:
+
+
+    FIELDS = ("calls", "rate_time_s", "step_time_s", "substrate_clamps", "floor_clamps", "flux")
+
+
+    def __init__(self, reactions):
+        self.names = [r.name for r in reactions]
+        self.reset()
+
+
+    def reset(self):
+        self.counters = np.zeros((len(self.names), len(self.FIELDS)))                   # Zeile = Reaktion, Spalten wie FIELDS
+
+
+    def step(self, j, reaction, dt):                                                    # wie Reaction.step / SplitReaction.step, zusätzlich mit Zählern
+        counters = self.counters[j]
+        start = time.perf_counter()
+        v = reaction.rate()
+        rate_done = time.perf_counter()
+        delta = v * dt
+        substrate = reaction.substrate
+        if substrate.conc < delta:                                                      # min(delta, substrate.conc) greift
+            counters[3] += 1
+        delta = min(delta, substrate.conc)
+        for metabolite, change in ((substrate, -delta), *((p, delta) for p in reaction.products)):
+            if metabolite.conc + change < 0:                                            # max(conc, 0) greift
+                counters[4] += 1
+            metabolite.update_conc(change)
+        end = time.perf_counter()
+        counters[0] += 1
+        counters[1] += rate_done - start
+        counters[2] += end - start
+        counters[5] += delta
+        return delta
+
+
+    def as_dict(self):                                                                  # {Reaktion: {Zähler: Wert}} zum Export (z.B. JSON, Streamlit)
+        result = {}
+        for name, row in zip(self.names, self.counters):
+            entry = dict(zip(self.FIELDS, row.tolist()))
+            for key in ("calls", "substrate_clamps", "floor_clamps"):
+                entry[key] = int(entry[key])
+            result[name] = entry
+        return result
+
+
+    def __repr__(self):
+        return f"Instrumentation({len(self.names)} Reaktionen, {int(self.counters[:, 0].sum())} Aufrufe)"
+
+
+# Klasse für gespeicherte Konzentrationsverläufe → vorab reserviertes float64-Array mit Zugriff über Metabolitnamen
+
+
+class Trajectory(Mapping):
+
+
+    def __init__(self, names, data, dt, stride=1, time=None, start=0):
+        self.names = list(names)                                                        # Spaltennamen (Metabolite)
+        self.data = data                                                                # Array (Zeilen, Metabolite); Zeile i = Schritt start + i * stride
+        self.dt = dt
+        self.stride = stride
+        self.start = start                                                              # Schritt der ersten Zeile (bei Teilstücken aus iter_simulate > 0)
+        self._time = time                                                               # explizites Zeitgitter (adaptive Löser), sonst aus dt und stride berechnet
+        self.solver_stats = None
+        self.accounting = None                                                          # FluxAccounting bei simulate(accounting=True)
+        self.final = data[-1] if len(data) else None                                    # Zustand nach dem letzten Schritt (auch wenn dieser wegen stride nicht gespeichert wurde)
+        self._columns = {name: i for i, name in enumerate(self.names)}
+
+
+    @classmethod
+    def empty(cls, names, steps, dt, stride=1):                                         # reserviert Platz für steps // stride + 1 Zeilen (inklusive Anfangswerten)
+        data = np.zeros((steps // stride + 1, len(names)), dtype=np.float64)
+        return cls(names, data, dt, stride)
+
+
+    def __getitem__(self, name):                                                        # Spalte eines Metaboliten (View auf das Array, keine Kopie)
+        return self.data[:, self._columns[name]]
+
+
+    def __iter__(self):
+        return iter(self.names)
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    @property
+    def time(self):                                                                     # Zeitpunkte der gespeicherten Zeilen in Sekunden
+        if self._time is not None:
+            return self._time
+        return (self.start + np.arange(len(self.data)) * self.stride) * self.dt
+
+
+    def downsample(self, max_rows):                                                     # höchstens max_rows gleichmäßig verteilte Zeilen (erste und letzte bleiben erhalten), z.B. für Diagramme
+        if len(self.data) <= max_rows:
+            return self
+        rows = np.unique(np.linspace(0, len(self.data) - 1, max_rows).round().astype(np.intp))
+        result = Trajectory(self.names, self.data[rows], self.dt, self.stride, time=self.time[rows])
+        result.final = self.final
+        return result
+
+
+    def plot(self, ax=None, max_rows=2000):                                             # Liniengrafik aller Metabolite; matplotlib wird erst hier geladen
+        import matplotlib.pyplot as plt
+        if ax is None:
+            _, ax = plt.subplots(figsize=(10, 6))
+        data = self.downsample(max_rows)
+        for met, values in data.items():
+            ax.plot(data.time, values, label=met)                                       # Kurve für jeden Metaboliten
+        ax.set_xlabel("Zeit (s)")
+        ax.set_ylabel("Konzentration (mmol/l)")
+        ax.legend()
+        ax.grid(True)
+        return ax
+
+
+    def to_dict(self):                                                                  # altes Format: Dictionary mit Listen
+        return {name: self[name].tolist() for name in self.names}
+
+
+    def __repr__(self):
+        return f"Trajectory({len(self.data)} Zeilen × {len(self.names)} Metabolite, dt={self.dt}, stride={self.stride})"
+
+
+# Kompilierte Form des Stoffwechselwegs → Stöchiometriematrix sowie Vmax/Km als Arrays
+
+_FLUSH_ROWS = 4096                                                                      # Zeilen pro Block beim Kopieren in das Ergebnisarray
+
+_ODE_METHODS = {                                                                        # adaptive Verfahren aus scipy.integrate.solve_ivp
+    "rk45": "RK45", "rk23": "RK23", "dop853": "DOP853",                                 # explizit
+    "radau": "Radau", "bdf": "BDF", "lsoda": "LSODA",                                   # implizit / steif
+}
+
+
+# Rechenkern für den kompilierten Euler-Schritt auf flachen Arrays → wird mit numba übersetzt, falls installiert (backend="numba")
+
+
+def _euler_kernel(x, substrates, products, vmax, km, steps, dt, stride, out, flux):
+    # x (batch, Metabolite), vmax/km (batch, Reaktionen), products (Reaktionen, max. Produkte) mit -1 aufgefüllt, out (batch, Zeilen, Metabolite),
+    # flux (batch, Reaktionen) → laufende Summe der Umsätze; flux mit 0 Spalten → keine Bilanz (kein Zusatzaufwand pro Schritt)
+    track = flux.shape[1] > 0
+    for b in range(x.shape[0]):
+        row = 1
+        for i in range(1, steps + 1):
+            for j in range(substrates.shape[0]):                                        # gleiche Reihenfolge und Begrenzungen wie Reaction.step
+                s = substrates[j]
+                c = x[b, s]
+                delta = vmax[b, j] * c / (km[b, j] + c) * dt if c > 0 else 0.0
+                if c < delta:                                                           # wie min(delta, substrate.conc)
+                    delta = c
+                c -= delta
+                x[b, s] = c if c > 0 else 0.0                                           # wie max(conc, 0)
+                if track:
+                    flux[b, j] += delta
+                for k in range(products.shape[1]):
+                    p = products[j, k]
+                    if p >= 0:
+                        c = x[b, p] + delta
+                        x[b, p] = c if c > 0 else 0.0
+            if i % stride == 0:
+                out[b, row, :] = x[b]
+                row += 1
+
+
+_NUMBA_KERNEL = None
+
+
+def _numba_kernel():                                                                    # übersetzt _euler_kernel beim ersten Aufruf; cache=True → Ergebnis wird in __pycache__ gespeichert (einmal pro Rechner)
+    global _NUMBA_KERNEL
+    if _NUMBA_KERNEL is None:
+        import numba
+        _NUMBA_KERNEL = numba.njit(cache=True, nogil=True)(_euler_kernel)
+    return _NUMBA_KERNEL
+
+
+_HAS_NUMBA = None
+
+
+def _has_numba():                                                                       # find_spec nur einmal pro Prozess (durchsucht sonst bei jedem Aufruf sys.path)
+    global _HAS_NUMBA
+    if _HAS_NUMBA is None:
+        _HAS_NUMBA = importlib.util.find_spec("numba") is not None
+    return _HAS_NUMBA
+
+
+def resolve_backend(backend):                                                           # "auto" → "numba" wenn installiert, sonst "numpy"
+    if backend == "auto":
+        return "numba" if _has_numba() else "numpy"
+    if backend == "numba" and not _has_numba():
+        raise ImportError("backend='numba' benötigt numba (pip install numba)")
+    if backend not in ("numba", "numpy"):
+        raise ValueError(f"Unbekanntes backend: {backend!r} (erlaubt: 'auto', 'numba', 'numpy')")
+    return backend
+
+
+class CompiledPathway:
+
+
+    def __init__(self, metabolites, reactions):
+        self.names = [m.name for m in metabolites]                                      # Spaltennamen der Trajektorie
+        index = {id(m): i for i, m in enumerate(metabolites)}                           # Zuordnung Objekt → Spaltenindex (einmalig beim Kompilieren statt bei jedem Schritt)
+        self.substrates = np.array([index[id(r.substrate)] for r in reactions], dtype=np.intp)
+        self.products = [tuple(index[id(p)] for p in r.products) for r in reactions]
+        self.product_index = np.full((len(reactions), max([len(p) for p in self.products], default=1)), -1, dtype=np.intp)
+        for j, prods in enumerate(self.products):                                       # Produkte als Matrix (mit -1 aufgefüllt) für den Rechenkern
+            self.product_index[j, :len(prods)] = prods
+        self.vmax = np.array([r.enzyme.vmax for r in reactions], dtype=np.float64)
+        self.km = np.array([r.enzyme.km for r in reactions], dtype=np.float64)
+
+        self.stoichiometry = np.zeros((len(metabolites), len(reactions)))              # Stöchiometriematrix S: Spalte j = Reaktion j, -1 für Substrat, +1 je Produkt
+        for j, (s, prods) in enumerate(zip(self.substrates, self.products)):
+            self.stoichiometry[s, j] -= 1.0
+            for p in prods:
+                self.stoichiometry[p, j] += 1.0
+
+
+    def with_parameters(self, vmax, km):                                                # gleiche Struktur mit anderen vmax/Km (Indizes und Stöchiometrie werden geteilt, nicht kopiert)
+        new = copy.copy(self)
+        new.vmax = np.array(vmax, dtype=np.float64)
+        new.km = np.array(km, dtype=np.float64)
+        return new
+
+
+    def run_batch(self, conc, vmax, km, steps, dt, stride=1, backend="auto", flux=None):   # wie run, aber für viele Zustände/Parametersätze gleichzeitig (Arrayoperationen über die Batch-Dimension); flux (batch, Reaktionen) wird aufsummiert, falls angegeben
+        n = len(conc)
+        out = np.empty((n, steps // stride + 1, len(self.names)), dtype=np.float64)
+        out[:, 0] = conc
+        if resolve_backend(backend) == "numba":
+            x = np.array(conc, dtype=np.float64)
+            vmax = np.ascontiguousarray(np.broadcast_to(vmax, (n, len(self.substrates))), dtype=np.float64)
+            km = np.ascontiguousarray(np.broadcast_to(km, (n, len(self.substrates))), dtype=np.float64)
+            totals = np.zeros((n, len(self.substrates) if flux is not None else 0))
+            _numba_kernel()(x, self.substrates, self.product_index, vmax, km, steps, float(dt), stride, out, totals)
+            if flux is not None:
+                flux += totals
+            return out
+        x = np.array(np.asarray(conc, dtype=np.float64).T)                              # (Metabolite, batch) → jede Metabolitzeile liegt zusammenhängend im Speicher
+        vmax = np.ascontiguousarray(np.broadcast_to(vmax, (n, len(self.substrates))).T)
+        km = np.ascontiguousarray(np.broadcast_to(km, (n, len(self.substrates))).T)
+        delta = np.empty(n)
+        denom = np.empty(n)
+        totals = np.zeros((len(self.substrates), n)) if flux is not None else None
+        row = 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(1, steps + 1):
+                for j, (s, prods) in enumerate(zip(self.substrates, self.products)):   # Reaktionen weiterhin nacheinander, gleiche Rechenreihenfolge wie Reaction.step
+                    c = x[s]
+                    np.multiply(vmax[j], c, out=delta)
+                    np.add(km[j], c, out=denom)
+                    np.divide(delta, denom, out=delta)
+                    np.multiply(delta, dt, out=delta)
+                    delta[c <= 0] = 0.0                                                 # Substrat <= 0 → Geschwindigkeit 0
+                    np.minimum(delta, c, out=delta)                                     # wie min(delta, substrate.conc)
+                    np.subtract(c, delta, out=c)
+                    np.maximum(c, 0.0, out=c)                                           # wie max(conc, 0)
+                    if totals is not None:
+                        np.add(totals[j], delta, out=totals[j])
+                    for p in prods:
+                        np.add(x[p], delta, out=x[p])
+                        np.maximum(x[p], 0.0, out=x[p])
+                if i % stride == 0:
+                    out[:, row] = x.T
+                    row += 1
+        if flux is not None:
+            flux += totals.T
+        return out
+
+
+    def rates(self, conc):                                                              # Michaelis-Menten-Geschwindigkeiten aller Reaktionen für einen Zustand (Substrat <= 0 → 0)
+        s = np.maximum(np.asarray(conc, dtype=np.float64)[..., self.substrates], 0.0)
+        return self.vmax * s / (self.km + s)
+
+
+    def conservation_laws(self):                                                        # Erhaltungsgrößen w mit w · S = 0 (hier: Kohlenstoff, Glukose zählt doppelt wegen der Spaltung)
+        _, singular, vt = np.linalg.svd(self.stoichiometry.T)
+        rank = int((singular > 1e-10 * singular.max()).sum())
+        return vt[rank:]
+
+
+    def derivative(self, conc):                                                         # dx/dt = S · v(x) für die kontinuierliche Form des Modells
+        return self.stoichiometry @ self.rates(conc)
+
+
+    def jacobian(self, conc):                                                           # analytische Jacobi-Matrix d(dx/dt)/dx: dv_j/ds = vmax·Km / (Km + s)² für s > 0
+        s = np.asarray(conc, dtype=np.float64)[self.substrates]
+        s_pos = np.maximum(s, 0.0)
+        dv = np.where(s >= 0, self.vmax * self.km / (self.km + s_pos) ** 2, 0.0)
+        jac = np.zeros((len(self.names), len(self.names)))
+        for j, sub in enumerate(self.substrates):                                       # jede Reaktion hängt nur von ihrem Substrat ab → Spalte sub
+            jac[:, sub] += self.stoichiometry[:, j] * dv[j]
+        return jac
+
+
+    def run(self, conc, steps, dt, out=None, stride=1, backend="auto", flux=None):     # Explizites Euler-Verfahren in derselben sequentiellen Reihenfolge wie Reaction.step; flux (Reaktionen) wird aufsummiert
+        if out is None:
+            out = np.empty((steps // stride + 1, len(self.names)), dtype=np.float64)    # vorab reserviertes Ergebnisarray (jeder stride-te Schritt)
+        out[0] = conc
+        if resolve_backend(backend) == "numba":                                         # übersetzter Rechenkern, Batch aus einem Zustand
+            x = np.array(conc, dtype=np.float64).reshape(1, -1)
+            totals = np.zeros((1, len(self.substrates) if flux is not None else 0))
+            _numba_kernel()(x, self.substrates, self.product_index, self.vmax[None], self.km[None],
+                            steps, float(dt), stride, out[None], totals)
+            if flux is not None:
+                flux += totals[0]
+            return x[0]
+        x = [float(c) for c in conc]
+        kernel = [(int(s), prods, float(vmax), float(km))                               # Parameter als Python-Floats → keine Attributzugriffe in der Schleife
+                  for s, prods, vmax, km in zip(self.substrates, self.products, self.vmax, self.km)]
+        rows = []                                                                       # Zwischenpuffer, wird blockweise ins Ergebnisarray kopiert (begrenzter Speicher)
+        append = rows.append
+        row = 1
+        if flux is None:                                                                # Variante einmal vor der Schleife wählen
+            for i in range(1, steps + 1):
+                for s, prods, vmax, km in kernel:                                       # Reaktionen nacheinander: jede sieht die bereits aktualisierten Konzentrationen der vorherigen
+                    c = x[s]
+                    delta = vmax * c / (km + c) * dt if c > 0 else 0
+                    if c < delta:                                                       # wie min(delta, substrate.conc)
+                        delta = c
+                    c -= delta
+                    x[s] = c if c > 0 else 0                                            # wie max(conc, 0)
+                    for p in prods:
+                        c = x[p] + delta
+                        x[p] = c if c > 0 else 0
+                if i % stride == 0:
+                    append(tuple(x))
+                    if len(rows) == _FLUSH_ROWS:
+                        out[row:row + len(rows)] = rows
+                        row += len(rows)
+                        rows.clear()
+        else:                                                                           # gleiche Schleife mit Flussbilanz
+            totals = [0.0] * len(kernel)
+            for i in range(1, steps + 1):
+                for j, (s, prods, vmax, km) in enumerate(kernel):
+                    c = x[s]
+                    delta = vmax * c / (km + c) * dt if c > 0 else 0
+                    if c < delta:
+                        delta = c
+                    c -= delta
+                    x[s] = c if c > 0 else 0
+                    totals[j] += delta
+                    for p in prods:
+                        c = x[p] + delta
+                        x[p] = c if c > 0 else 0
+                if i % stride == 0:
+                    append(tuple(x))
+                    if len(rows) == _FLUSH_ROWS:
+                        out[row:row + len(rows)] = rows
+                        row += len(rows)
+                        rows.clear()
+            flux += totals
+        if rows:
+            out[row:row + len(rows)] = rows
+        return np.array(x, dtype=np.float64)                                            # Endzustand (auch wenn der letzte Schritt nicht gespeichert wurde)
+
+
+# Cache für Simulationsergebnisse (z.B. für den Simulationsdienst) → LRU mit Speichergrenze; pro Schlüssel wird der längste bisher gerechnete Lauf gespeichert
+
+
+class SimulationCache:
+
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes                                                      # Obergrenze für den Speicher aller gespeicherten Trajektorien
+        self.nbytes = 0
+        self._entries = OrderedDict()                                                   # Schlüssel (ohne steps) → Trajektorie des längsten bisher gerechneten Laufs
+        self._lock = threading.Lock()                                                   # mehrere Threads (z.B. Streamlit-Sitzungen, Dienst) greifen gleichzeitig zu
+
+
+    def head(self, key, steps):                                                         # die ersten steps Schritte des gespeicherten Laufs (View, keine Kopie) oder None, wenn noch nicht so weit gerechnet
+        cached = self.get(key)
+        if cached is None or len(cached.data) <= steps:
+            return None
+        return Trajectory(cached.names, cached.data[:steps + 1], cached.dt)
 
 
+    def get(self, key):                                                                 # gespeicherte Trajektorie zu key oder None
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)                                          # zuletzt benutzt
+        return cached
 
 
+    def store(self, key, trajectory):                                                   # Daten werden schreibgeschützt, da sie zwischen allen Aufrufern geteilt werden
+        trajectory.data.flags.writeable = False
+        if trajectory.data.nbytes > self.max_bytes:                                     # zu groß für den Cache → nur zurückgeben
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.data.nbytes
+            self._entries[key] = trajectory
+            self.nbytes += trajectory.data.nbytes
+            while self.nbytes > self.max_bytes:                                         # älteste Einträge verwerfen
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.data.nbytes
 
 
+    def __len__(self):
+        return len(self._entries)